@@ -12,29 +12,201 @@ It can automatically turn PEP 257 compliant that follow the more restrictive
 Google style guide into appropriate Doxygen tags, and is even aware of
 doctests.
 """
-from __future__ import print_function
-
-from ast import NodeVisitor, parse, iter_fields, AST, Name, get_docstring
-from argparse import ArgumentParser
-from re import compile as regexpCompile, IGNORECASE, MULTILINE
-from types import GeneratorType
+from ast import NodeVisitor, parse, AST, Name, Expr, Constant, \
+    Module, Assign, Call, FunctionDef, AsyncFunctionDef, ClassDef
+from argparse import ArgumentParser, Namespace
+from re import compile as regexpCompile, IGNORECASE
 from sys import argv, stderr, exit as sysExit
-from os.path import basename, getsize
+from os.path import basename
 from os import linesep, sep
 from string import whitespace
-from codecs import BOM_UTF8, open as codecsOpen
+from codecs import BOM_UTF8, lookup as codecLookup
+from io import BytesIO, StringIO, TextIOWrapper
 from codeop import compile_command
-from chardet import detect
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+
+@lru_cache(maxsize=4096)
+def _compileOutcome(source):
+    """
+    Compile a possible snippet of code and remember how that went.
+
+    Returns whether the snippet is complete code along with the type and
+    arguments of whatever exception compiling it raised (if any).  The
+    exception itself isn't kept, as raising the very same instance again
+    and again would have it pick up tracebacks and context from unrelated
+    docstrings.
+    """
+    try:
+        return compile_command(source) is not None, None
+    except Exception as error:
+        return False, (type(error), error.args)
+
+
+def _compileCommand(source):
+    """
+    Check whether a snippet of code is complete, valid code.
+
+    This is a cached stand-in for codeop.compile_command; docstrings tend to
+    repeat the same short snippets over and over, and there's no need to run
+    the compiler on each of them more than once.  Just like compile_command
+    it raises an exception for invalid code.
+    """
+    isComplete, error = _compileOutcome(source)
+    if error is not None:
+        errorType, errorArgs = error
+        raise errorType(*errorArgs)
+    return isComplete
+
+
+@lru_cache(maxsize=None)
+def _indentPartRE(indentStr):
+    """
+    Get the regex matching a given indent repeated inside a comment line.
+
+    Only a handful of different indents turn up in any source tree, so the
+    patterns are compiled once per indent rather than once per docstring.
+    """
+    return regexpCompile("{istr}#+({istr})".format(istr=indentStr))
+
+
+class _CodeChecker:
+    """
+    Check whether or not lines of a docstring appear to be Python code.
+
+    Lines are fed in one at a time.  As a single line is often ambiguous on
+    its own, the checker keeps track of what it's seen until it can make up
+    its mind, at which point it marks the start or end of a code block in the
+    lines it was given and updates the shared code block state (the single
+    item in inCodeBlockObj).
+    """
+
+    # The error line should match traceback lines, error exception lines, and
+    # (due to a weird behavior of codeop) single word lines.
+    __errorLineRE = regexpCompile(r"^\s*((?:\S+Error|Traceback.*):?\s*(.*)|@?[\w.]+)\s*$",
+                                  IGNORECASE)
+
+    # Interactive prompts that mark a line as code.
+    __codePrompts = ('>>>', '...')
+
+    # Markers appended to a docstring line to open or close a code block.
+    __codeStartSuffix = f'{linesep}# @code{linesep}'
+    __codeEndSuffix = f'{linesep}# @endcode{linesep}'
+
+    def __init__(self, inCodeBlockObj):
+        """Set up a checker that hasn't seen any lines yet."""
+        self.inCodeBlockObj = inCodeBlockObj
+        self.testLine = ''
+        self.testLineNum = 1
+        self.currentLineNum = 0
+        # What the next line is needed for: starting a fresh test, replacing
+        # an ambiguous test line, or continuing a possibly incomplete one.
+        self.awaiting = 'start'
 
+    @staticmethod
+    def _isErrorLine(testLine):
+        """
+        Check whether a (stripped) line looks like an error line.
 
-def coroutine(func):
-    """Implement the coroutine pattern as a decorator."""
-    def __start(*args, **kwargs):
-        """Automatically calls next() on the internal generator function."""
-        __cr = func(*args, **kwargs)
-        next(__cr)
-        return __cr
-    return __start
+        This is the same as matching the error line regex, but as that can
+        only match something other than a single word if there's an error or
+        a traceback involved, single words are checked for directly instead.
+        """
+        lowerTestLine = testLine.lower()
+        if 'error' in lowerTestLine or 'traceback' in lowerTestLine:
+            return bool(_CodeChecker.__errorLineRE.match(testLine))
+        word = testLine[1:] if testLine.startswith('@') else testLine
+        return word.replace('.', '_').replace('_', 'a').isalnum()
+
+    def feed(self, line, lines, lineNum):
+        """
+        Take in the next line.
+
+        Along with the line itself come the lines processed so far (where any
+        code block markers get placed) and the number of the line within them.
+        """
+        if self.awaiting == 'start':
+            self.testLine = line.strip()
+            self.testLineNum = 1
+            self.currentLineNum = 0
+        elif self.awaiting == 'replacement':
+            self.testLine = line.strip()
+            self.currentLineNum = lineNum - self.testLineNum
+        else:
+            line = line.strip()
+            if line.startswith('>>>'):
+                # Definitely code, don't compile further.
+                self.currentLineNum = lineNum - self.testLineNum
+                self.__markCode(lines, True)
+                return
+            self.testLine = (self.testLine + linesep + line).strip()
+            self.testLineNum += 1
+            self.currentLineNum = lineNum - self.testLineNum
+
+        testLine = self.testLine
+        if not testLine or testLine == '...' or self._isErrorLine(testLine):
+            # These are ambiguous.
+            self.awaiting = 'replacement'
+            return
+        if testLine.startswith(_CodeChecker.__codePrompts):
+            # This is definitely code.
+            lineOfCode = True
+        else:
+            try:
+                compLine = _compileCommand(testLine)
+                if compLine and lines[self.currentLineNum].strip().startswith('#'):
+                    lineOfCode = True
+                else:
+                    self.awaiting = 'continuation'
+                    return
+            except (SyntaxError, RuntimeError):
+                # This is definitely not code.
+                lineOfCode = False
+            except Exception:
+                # Other errors are ambiguous.
+                self.awaiting = 'replacement'
+                return
+        self.currentLineNum = lineNum - self.testLineNum
+        self.__markCode(lines, lineOfCode)
+
+    def __markCode(self, lines, lineOfCode):
+        """Open or close a code block as needed now that we know what we've got."""
+        if not self.inCodeBlockObj[0] and lineOfCode:
+            self.inCodeBlockObj[0] = True
+            lines[self.currentLineNum] += _CodeChecker.__codeStartSuffix
+        elif self.inCodeBlockObj[0] and lineOfCode is False:
+            # None is ambiguous, so strict checking
+            # against False is necessary.
+            self.inCodeBlockObj[0] = False
+            lines[self.currentLineNum] += _CodeChecker.__codeEndSuffix
+        self.awaiting = 'start'
+
+
+class _VisitorTable(dict):
+    """
+    Map node classes to the handlers a walker has for them.
+
+    Just like NodeVisitor.visit, a node class is handled by the walker's
+    visit_ method named after it, if there is one, and by generic_visit
+    otherwise.  The handler is only looked up the first time a class turns
+    up though, and is simply fetched from the table from then on.
+    """
+
+    def __init__(self, walker, visitors):
+        """Start off with the given handlers for the given walker."""
+        super().__init__(visitors)
+        self.walker = walker
+
+    def __missing__(self, nodeClass):
+        """Look up the handler for a class not seen before."""
+        name = 'visit_' + nodeClass.__name__
+        visitor = getattr(self.walker, name, None)
+        # NodeVisitor's own handlers don't know about containing nodes.
+        if visitor is None or getattr(type(self.walker), name) is getattr(NodeVisitor, name, None):
+            visitor = self.walker.generic_visit
+        self[nodeClass] = visitor
+        return visitor
 
 
 class AstWalker(NodeVisitor):
@@ -47,15 +219,13 @@ class AstWalker(NodeVisitor):
     assignments, and function calls, as all the information we want to pass
     to Doxygen is found within these constructs).  If the autobrief option
     is set, it further attempts to parse docstrings to create appropriate
-    Doxygen tags.
+    Doxygen tags.  Just as with NodeVisitor, subclasses may add visit_
+    methods for other kinds of nodes (which get the containing nodes too).
     """
 
     # We have a number of regular expressions that we use.  They don't
     # vary across instances and so are compiled directly in the class
     # definition.
-    __indentRE = regexpCompile(r'^(\s*)\S')
-    __newlineRE = regexpCompile(r'^#', MULTILINE)
-    __blanklineRE = regexpCompile(r'^\s*$')
     __docstrMarkerRE = regexpCompile(r"\s*([uUbB]*[rR]?(['\"]{3}))")
     __docstrOneLineRE = regexpCompile(r"\s*[uUbB]*[rR]?(['\"]{3})(.+)\1")
 
@@ -72,15 +242,24 @@ class AstWalker(NodeVisitor):
                                   r"Attribute\s*\(['\"]{1,3}(.*)['\"]{1,3}\)",
                                   IGNORECASE)
 
-    __singleLineREs = {
-        ' @author: ': regexpCompile(r"^(\s*Authors?:\s*)(.*)$", IGNORECASE),
-        ' @copyright ': regexpCompile(r"^(\s*Copyright:\s*)(.*)$", IGNORECASE),
-        ' @date ': regexpCompile(r"^(\s*Date:\s*)(.*)$", IGNORECASE),
-        ' @file ': regexpCompile(r"^(\s*File:\s*)(.*)$", IGNORECASE),
-        ' @version: ': regexpCompile(r"^(\s*Version:\s*)(.*)$", IGNORECASE),
-        ' @note ': regexpCompile(r"^(\s*Note:\s*)(.*)$", IGNORECASE),
-        ' @warning ': regexpCompile(r"^(\s*Warning:\s*)(.*)$", IGNORECASE)
-    }
+    # The simple one-line Doxygen commands we recognize, as (name, docstring
+    # tag pattern, Doxygen command) triples.  Like the docstring constructs
+    # below they're folded into a single alternation, so a line only needs
+    # one pass through the regular expression engine to find its command.
+    __singleLineTags = (
+        ('author', r'Authors?', ' @author: '),
+        ('copyright', r'Copyright', ' @copyright '),
+        ('date', r'Date', ' @date '),
+        ('file', r'File', ' @file '),
+        ('version', r'Version', ' @version: '),
+        ('note', r'Note', ' @note '),
+        ('warning', r'Warning', ' @warning ')
+    )
+    __singleLineRE = regexpCompile(r"^(?:{0}).*$".format('|'.join(
+        r'(?P<{0}>\s*{1}:\s*)'.format(name, tagPattern)
+        for name, tagPattern, _ in __singleLineTags
+    )), IGNORECASE)
+    __singleLineCommands = {name: doxyTag for name, _, doxyTag in __singleLineTags}
     __argsStartRE = regexpCompile(r"^(\s*(?:(?:Keyword\s+)?"
                                   r"(?:A|Kwa)rg(?:ument)?|Attribute)s?"
                                   r"\s*:\s*)$", IGNORECASE)
@@ -91,35 +270,151 @@ class AstWalker(NodeVisitor):
                                     IGNORECASE)
     __listRE = regexpCompile(r"^\s*(([\w\.]+),\s*)+(&|and)?\s*([\w\.]+)$")
     __singleListItemRE = regexpCompile(r'^\s*([\w\.]+)\s*$')
-    __listItemRE = regexpCompile(r'([\w\.]+),?\s*')
     __examplesStartRE = regexpCompile(r"^\s*(?:Example|Doctest)s?:\s*$",
                                       IGNORECASE)
     __sectionStartRE = regexpCompile(r"^\s*(([A-Z]\w* ?){1,2}):\s*$")
-    # The error line should match traceback lines, error exception lines, and
-    # (due to a weird behavior of codeop) single word lines.
-    __errorLineRE = regexpCompile(r"^\s*((?:\S+Error|Traceback.*):?\s*(.*)|@?[\w.]+)\s*$",
-                                  IGNORECASE)
 
     # searching for reStructuredText field lists
     # __rst_paramRE = regexpCompile(r"^\s*(?::param(eter)?|:arg(ument)?|:key(word)?)"
     #                               r"\s*(\w*)\s*(\w*)\s*:(.*)") # search for :param, :parameter,
     #                                                              :arg, :argument, :key, :keyword
     # this searches for the keyword and the colons, but returns all in between as one group:
-    __rst_paramRE = regexpCompile(r"^\s*(?::param(eter)?|:arg(ument)?|:key(word)?)([^:]*):\s*(.*)")
-    __rst_typeRE = regexpCompile(r"^(\s*)(?::type)"
-                                 r"\s*(\w*)\s*:(.*)")   # search for :type
-    __rst_rtypeRE = regexpCompile(r"^(\s*)(?::rtype)\s*(.*):(.*)")  # search for rtype
-    __rst_returnRE = regexpCompile(r"^\s*(?::return)\s*(.*): (.*)$")
+    # (The groups we use are named so they can be picked straight out of a
+    # match of the combined docstring line regex below.)
+    __rst_paramRE = regexpCompile(r"^\s*(?::param(eter)?|:arg(ument)?|:key(word)?)"
+                                  r"(?P<paramDecl>[^:]*):\s*(?P<paramDesc>.*)")
+    __rst_typeRE = regexpCompile(r"^(?P<typeIndent>\s*)(?::type)"
+                                 r"\s*(?P<typeName>\w*)\s*:(?P<typeDesc>.*)")   # search for :type
+    __rst_rtypeRE = regexpCompile(r"^(?P<rtypeIndent>\s*)(?::rtype)\s*"
+                                  r"(?P<rtypeName>.*):(?P<rtypeDesc>.*)")  # search for rtype
+    __rst_returnRE = regexpCompile(r"^\s*(?::return)\s*(?P<returnType>.*): (?P<returnDesc>.*)$")
     __rst_literal_sectionRE = regexpCompile(r"^(.*)::$")
     __rst_tableRE = regexpCompile(r"^\s*=+\s+(=+\s*)+$")  # end of table is a blank line
+    __rst_tableColumnRE = regexpCompile(r"= ")  # the space after each = run of a column border
 
     __LITERAL_SECTION_MARK = "~~~~~~"
+    # The characters an otherwise empty comment line is made up of.
+    __commentBlankChars = whitespace + '#'
+
+    # Turns the separators between list items into plain whitespace.
+    __listSeparatorTable = str.maketrans(',&', '  ')
+
+    __examplesHeading = f' @b Examples{linesep}# @code'
+
+    # The docstring line constructs we recognize, in order of precedence.
+    # They're folded into a single alternation with one named group per
+    # construct so that each line only needs a single pass through the
+    # regular expression engine to find out which (if any) it is.
+    __docLineKinds = (
+        ('returnsStart', __returnsStartRE),
+        ('argsStart', __argsStartRE),
+        ('rstParam', __rst_paramRE),
+        ('rstType', __rst_typeRE),
+        ('rstReturn', __rst_returnRE),
+        ('rstRtype', __rst_rtypeRE),
+        ('rstTable', __rst_tableRE),
+        ('args', __argsRE),
+        ('raisesStart', __raisesStartRE),
+        ('list', __listRE),
+        ('examplesStart', __examplesStartRE),
+        ('sectionStart', __sectionStartRE)
+    )
+    __docLineRE = regexpCompile('|'.join(
+        '(?P<{0}>(?i:{1}))'.format(kind, kindRE.pattern) if kindRE.flags & IGNORECASE
+        else '(?P<{0}>{1})'.format(kind, kindRE.pattern)
+        for kind, kindRE in __docLineKinds
+    ))
+
+    # The node fields that can hold statements.  Everything else is an
+    # expression of some sort, which can only be of interest to us if it
+    # might be a call marking an interface implementation.
+    __statementFields = ('body', 'orelse', 'finalbody', 'handlers', 'cases')
+    # The node fields that only ever hold names, constants, flags, or
+    # expression contexts, none of which can contain anything of interest.
+    __leafFields = frozenset(('id', 'ctx', 'attr', 'arg', 'name', 'names', 'module', 'asname',
+                              'level', 'kind', 'type_comment', 'is_async', 'conversion'))
+
+    def __init__(self, lines, arguments, source=None):
+        """
+        Initialize a few class variables in preparation for our walk.
 
-    def __init__(self, lines, arguments):
-        """Initialize a few class variables in preparation for our walk."""
+        If the caller already has the whole source as a single string it may
+        pass it in as well (it must match lines) to spare parseLines having to
+        join the lines back together again.
+        """
         self.lines = lines
         self.args = arguments
+        self.source = source
         self.docLines = []
+        # Whether the source could hold any Zope-style interface attributes or
+        # implementation declarations at all.  Until parseLines has had a look
+        # at the whole source we have to assume it might.
+        self._mayHaveAttributes = True
+        self._mayHaveImplements = True
+        # The fields generic_visit descends into (None meaning all of them),
+        # and the ones that leaves for each node class seen so far.
+        self._childFields = None
+        self._childFieldsByClass = {}
+        # Map node classes directly to their handlers so dispatching a node
+        # is a single dictionary lookup rather than a getattr call (keyed on
+        # the class itself, there's not even a name to look up).  Any other
+        # handlers (say, ones a subclass adds) get filled in as needed.
+        self._visitors = _VisitorTable(self, {
+            Module: self.visit_Module,
+            Assign: self.visit_Assign,
+            Call: self.visit_Call,
+            FunctionDef: self.visit_FunctionDef,
+            AsyncFunctionDef: self.visit_AsyncFunctionDef,
+            ClassDef: self.visit_ClassDef
+        })
+        # Our own handlers only care about a few kinds of nodes, so parts of
+        # the tree that can't hold any of them are skipped.  A subclass with
+        # handlers of its own gets to see every last node though.
+        walkerClass = type(self)
+        self._walkEverything = walkerClass is not AstWalker and any(
+            name.startswith('visit_') and getattr(walkerClass, name) is not getattr(AstWalker, name, None)
+            for name in dir(walkerClass))
+
+    @staticmethod
+    def _getIndent(line):
+        """Return the leading whitespace of a line (none for blank lines)."""
+        strippedLine = line.lstrip()
+        return line[:len(line) - len(strippedLine)] if strippedLine else ''
+
+    @staticmethod
+    def _isBlankComment(line):
+        """Return whether a line is blank apart from leading comment markers."""
+        text = line.lstrip('#')
+        return not text or text.isspace()
+
+    @staticmethod
+    def _getNodeIndent(line, node):
+        """
+        Return the leading whitespace of the line a statement starts on.
+
+        The statement's column offset usually marks the end of the indent
+        already, which saves stripping the whole line; it doesn't when the
+        statement isn't the first thing on its line (or the line has been
+        rewritten), in which case we fall back to _getIndent.
+        """
+        indentEnd = node.col_offset
+        indentStr = line[:indentEnd]
+        if (not indentStr or indentStr.isspace()) and line[indentEnd:indentEnd + 1].strip():
+            return indentStr
+        return AstWalker._getIndent(line)
+
+    @staticmethod
+    def _getIndentWidth(line, tabLength):
+        """
+        Return the width of the leading whitespace of a line.
+
+        Tabs are expanded to the given tab length, although the expanded
+        copy of the line is only built when there's actually a tab in it.
+        """
+        if '\t' not in line:
+            return len(line) - len(line.lstrip())
+        expandedLine = line.expandtabs(tabLength)
+        return len(expandedLine) - len(expandedLine.lstrip())
 
     @staticmethod
     def _stripOutAnds(inStr):
@@ -132,81 +427,46 @@ class AstWalker(NodeVisitor):
         """Append end code marker if needed."""
         assert isinstance(line, str)
         if inCodeBlock:
-            line = '# @endcode{0}{1}'.format(linesep, line.rstrip())
+            line = f'# @endcode{linesep}{line.rstrip()}'
             inCodeBlock = False
         return line, inCodeBlock
 
     @staticmethod
-    @coroutine
     def _checkIfCode(inCodeBlockObj):
-        """Check whether or not a given line appears to be Python code."""
-        while True:
-            line, lines, lineNum = (yield)
-            testLineNum = 1
-            currentLineNum = 0
-            testLine = line.strip()
-            lineOfCode = None
-            while lineOfCode is None:
-                match = AstWalker.__errorLineRE.match(testLine)
-                if not testLine or testLine == '...' or match:
-                    # These are ambiguous.
-                    line, lines, lineNum = (yield)
-                    testLine = line.strip()
-                    # testLineNum = 1
-                elif testLine.startswith('>>>'):
-                    # This is definitely code.
-                    lineOfCode = True
-                elif testLine.startswith('...'):
-                    lineOfCode = True
-                else:
-                    try:
-                        compLine = compile_command(testLine)
-                        if compLine and lines[currentLineNum].strip().startswith('#'):
-                            lineOfCode = True
-                        else:
-                            line, lines, lineNum = (yield)
-                            line = line.strip()
-                            if line.startswith('>>>'):
-                                # Definitely code, don't compile further.
-                                lineOfCode = True
-                            else:
-                                testLine += linesep + line
-                                testLine = testLine.strip()
-                                testLineNum += 1
-                    except (SyntaxError, RuntimeError):
-                        # This is definitely not code.
-                        lineOfCode = False
-                    except Exception:
-                        # Other errors are ambiguous.
-                        line, lines, lineNum = (yield)
-                        testLine = line.strip()
-                        # testLineNum = 1
-                currentLineNum = lineNum - testLineNum
-            if not inCodeBlockObj[0] and lineOfCode:
-                inCodeBlockObj[0] = True
-                lines[currentLineNum] = '{0}{1}# @code{1}'.format(
-                    lines[currentLineNum],
-                    linesep
-                )
-            elif inCodeBlockObj[0] and lineOfCode is False:
-                # None is ambiguous, so strict checking
-                # against False is necessary.
-                inCodeBlockObj[0] = False
-                lines[currentLineNum] = '{0}{1}# @endcode{1}'.format(
-                    lines[currentLineNum],
-                    linesep
-                )
-
-    @coroutine
-    def __alterDocstring(self, tail='', writer=None):
+        """Return a checker for whether or not given lines appear to be Python code."""
+        return _CodeChecker(inCodeBlockObj)
+
+    @staticmethod
+    def __nextDocLineKind(line, docLineKind):
+        """
+        Find the next kind of docstring construct a line matches.
+
+        Only constructs of lower precedence than the given one are considered.
+        This is needed when the construct a line first matched turns out not
+        to apply in the current context (or the line got rewritten).
+        """
+        laterKinds = False
+        for kind, kindRE in AstWalker.__docLineKinds:
+            if laterKinds and kindRE.match(line):
+                return kind
+            laterKinds = laterKinds or kind == docLineKind
+        return None
+
+    def __alterDocstring(self, tail=''):
         """
-        Run eternally, processing docstring lines.
+        Process the docstring lines.
 
-        Parses docstring lines as they get fed in via send, applies appropriate
-        Doxygen tags, and passes them along in batches for writing.
+        Parses the lines in docLines, applies appropriate Doxygen tags, and
+        returns the resulting batches for writing.  The batches are kept as
+        three parallel lists (first line numbers, last line numbers, and the
+        replacement lines) rather than as a list of tuples.
         """
-        assert isinstance(tail, str) and isinstance(writer, GeneratorType)
+        assert isinstance(tail, str)
 
+        # Finished batches, one entry per batch in each list.
+        batchFirstLineNums = []
+        batchLastLineNums = []
+        batchLines = []
         lines = []  # get's filled with changed line data until it is written out again
         timeToSend = False
         inCodeBlock = False       # local CodeBlock state
@@ -216,313 +476,348 @@ class AstWalker(NodeVisitor):
         in_rst_table = False
         rst_table_start_line_number = -1
         table_count = 0
-        rst_table_middle_column_positions = []  # first and last column are line dependent...
+        rst_table_middle_column_positions = ()  # first and last column are line dependent...
         prefix = ''
         firstLineNum = -1
         sectionHeadingIndent = 0
         codeChecker = self._checkIfCode(inCodeBlockObj)
-        while True:
-            lineNum, line = (yield)
+        # Look up the matchers needed for every line just once up front.
+        matchSingleLine = AstWalker.__singleLineRE.match
+        matchDocLine = AstWalker.__docLineRE.match
+        matchSingleListItem = AstWalker.__singleListItemRE.match
+        # Likewise for the options, which don't change while we're at it.
+        tabLength = self.args.tablength
+        autobrief = self.args.autobrief
+        autocode = self.args.autocode
+        for lineNum, line in enumerate(self.docLines):
             if firstLineNum < 0:
                 firstLineNum = lineNum
-            # Don't bother doing extra work if it's a sentinel.
-            if line is not None:
-                # Also limit work if we're not parsing the docstring.
-                if self.args.autobrief:
-                    for doxyTag, tagRE in AstWalker.__singleLineREs.items():
-                        match = tagRE.search(line)
-                        if match:
-                            # We've got a simple one-line Doxygen command
-                            if lines:
-                                lines[-1], inCodeBlock = self._endCodeIfNeeded(
-                                    lines[-1], inCodeBlock)
-                            inCodeBlockObj[0] = inCodeBlock
-                            writer.send((firstLineNum, lineNum - 1, lines))
-                            lines = []
-                            firstLineNum = lineNum
-                            line = line.replace(match.group(1), doxyTag)
-                            timeToSend = True
-
-                    # Special Line Mode handlings:
-                    if inSection:
-                        # The last line belonged to a section.
-                        # Does this one too? (Ignoring empty lines.)
-                        match = AstWalker.__blanklineRE.match(line)
-                        if not match:
-                            indent = len(line.expandtabs(self.args.tablength)) - \
-                                len(line.expandtabs(self.args.tablength).lstrip())
-                            if indent <= sectionHeadingIndent:
-                                inSection = False
+            # Also limit work if we're not parsing the docstring.
+            if autobrief:
+                match = matchSingleLine(line)
+                if match:
+                    # We've got a simple one-line Doxygen command
+                    if inCodeBlock and lines:
+                        lines[-1], inCodeBlock = self._endCodeIfNeeded(
+                            lines[-1], inCodeBlock)
+                    inCodeBlockObj[0] = inCodeBlock
+                    batchFirstLineNums.append(firstLineNum)
+                    batchLastLineNums.append(lineNum - 1)
+                    batchLines.append(lines)
+                    lines = []
+                    firstLineNum = lineNum
+                    line = line.replace(match.group(match.lastgroup),
+                                        AstWalker.__singleLineCommands[match.lastgroup])
+                    timeToSend = True
+
+                # Special Line Mode handlings:
+                if inSection:
+                    # The last line belonged to a section.
+                    # Does this one too? (Ignoring empty lines.)
+                    if line.strip():
+                        indent = self._getIndentWidth(line, tabLength)
+                        if indent <= sectionHeadingIndent:
+                            inSection = False
+                        else:
+                            if lines[-1] == '#':
+                                # If the last line was empty, but we're still in a section
+                                # then we need to start a new paragraph.
+                                lines[-1] = '# @par'
+                elif in_literal_section:
+                    # currently there's a literal section active
+                    if line.strip():
+                        # evaluate only non blank lines
+                        current_indent = self._getIndentWidth(line, tabLength)
+                        if current_indent > sectionHeadingIndent:
+                            # just use it unchanged, but ensure it is at least 4 spaces indented
+                            # doxygen only evaluates relative indents to former indent level
+                            if (current_indent - sectionHeadingIndent) < 4:
+                                extra_indent = " " * (4 - current_indent + sectionHeadingIndent)
                             else:
-                                if lines[-1] == '#':
-                                    # If the last line was empty, but we're still in a section
-                                    # then we need to start a new paragraph.
-                                    lines[-1] = '# @par'
-                    elif in_literal_section:
-                        # currently there's a literal section active
-                        match = AstWalker.__blanklineRE.match(line)
-                        if not match:
-                            # evaluate only non blank lines
-                            current_indent = len(line.expandtabs(self.args.tablength)) \
-                                - len(line.expandtabs(self.args.tablength).lstrip())
-                            if current_indent > sectionHeadingIndent:
-                                # just use it unchanged, but ensure it is at least 4 spaces indented
-                                # doxygen only evaluates relative indents to former indent level
-                                if (current_indent - sectionHeadingIndent) < 4:
-                                    extra_indent = " " * (4 - current_indent + sectionHeadingIndent)
-                                else:
-                                    extra_indent = ''
-                                lines.append("#" + extra_indent + line)
-                                continue
-                            in_literal_section = False
-                            # line = line.rstrip() + "Le"
-                            # lines.append("#" + AstWalker.__LITERAL_SECTION_MARK)
-                            # fencing requires line addition -> which is not yet supported here
-                    elif in_rst_table:
-                        # end table on a blank line
-                        match = AstWalker.__blanklineRE.match(line)
-                        if match:
-                            in_rst_table = False
-                            lines.append("#" + line)
+                                extra_indent = ''
+                            lines.append("#" + extra_indent + line)
                             continue
-                        # check for intermediate border lines -> doxygen only knows them at
-                        # second table line as separator line ...
-                        match = AstWalker.__rst_tableRE.match(line)
-                        if match:
-                            if rst_table_start_line_number + 2 == lineNum:
-                                line = line.replace("=", "-")
-                            else:
-                                # line = line.replace("="," ") # white spaces will end the table... so use
-                                # replace every starting = with - and all following with ' '
-                                line = line.replace(" =", " -")
-                                line = line.replace("=", " ")
-                        # insert pipes before first text and behind last text ... well not always
-                        # needed so skip it for now
-                        # insert pipes on all middle positions, check if there's a whitespace there
-                        for pos in rst_table_middle_column_positions:
-                            if line[pos] == ' ':
-                                line = line[:pos] + '|' + line[pos + 1:]
+                        in_literal_section = False
+                        # line = line.rstrip() + "Le"
+                        # lines.append("#" + AstWalker.__LITERAL_SECTION_MARK)
+                        # fencing requires line addition -> which is not yet supported here
+                elif in_rst_table:
+                    # end table on a blank line
+                    if not line.strip():
+                        in_rst_table = False
+                        lines.append("#" + line)
+                        continue
+                    # check for intermediate border lines -> doxygen only knows them at
+                    # second table line as separator line ...
+                    match = AstWalker.__rst_tableRE.match(line)
+                    if match:
+                        if rst_table_start_line_number + 2 == lineNum:
+                            line = line.replace("=", "-")
+                        else:
+                            # line = line.replace("="," ") # white spaces will end the table... so use
+                            # replace every starting = with - and all following with ' '
+                            line = line.replace(" =", " -")
+                            line = line.replace("=", " ")
+                    # insert pipes before first text and behind last text ... well not always
+                    # needed so skip it for now
+                    # insert pipes on all middle positions, check if there's a whitespace there
+                    # (editing the characters in place and joining them back up once;
+                    # plain ASCII rows can use bytes, where that's just integer work)
+                    if rst_table_middle_column_positions:
+                        if line.isascii():
+                            lineBytes = bytearray(line, 'ascii')
+                            for pos in rst_table_middle_column_positions:
+                                if lineBytes[pos] == 0x20:
+                                    lineBytes[pos] = 0x7C
+                            line = lineBytes.decode('ascii')
+                        else:
+                            lineChars = list(line)
+                            for pos in rst_table_middle_column_positions:
+                                if lineChars[pos] == ' ':
+                                    lineChars[pos] = '|'
                             # else:
                                 # well miss formated simple rst table
                                 # -> let the garbage flow... until next blank line...
                                 # Note: multiline rst table cells are not translateable to
                                 # simple Markdown...
-                        lines.append("#" + line)
-                        continue  # no further translation needed here
+                            line = ''.join(lineChars)
+                    lines.append("#" + line)
+                    continue  # no further translation needed here
+                # Find out in one go which (if any) construct this line is.
+                match = matchDocLine(line)
+                docLineKind = match.lastgroup if match else None
+                if docLineKind == 'returnsStart':
                     match = AstWalker.__returnsStartRE.match(line)
-                    if match:
-                        # We've got a "returns" section
+                    # We've got a "returns" section
+                    if inCodeBlock:
                         lines[-1], inCodeBlock = self._endCodeIfNeeded(
                             lines[-1], inCodeBlock)
-                        inCodeBlockObj[0] = inCodeBlock
-                        line = line.replace(match.group(0), ' @return\t').rstrip()
-                        prefix = '@return\t'
-                    else:
+                    inCodeBlockObj[0] = inCodeBlock
+                    line = line.replace(match.group(0), ' @return\t').rstrip()
+                    prefix = '@return\t'
+                else:
+                    if docLineKind == 'argsStart':
                         match = AstWalker.__argsStartRE.match(line)
-                        if match:
-                            # We've got an "arguments" section
-                            line = line.replace(match.group(0), '').rstrip()
-                            if 'attr' in match.group(0).lower():
-                                prefix = '@property\t'
-                            else:
-                                prefix = '@param\t'
-                            if lines:
-                                lines[-1], inCodeBlock = self._endCodeIfNeeded(lines[-1], inCodeBlock)
-                            inCodeBlockObj[0] = inCodeBlock
-                            lines.append('#' + line)
-                            continue
-                        match = AstWalker.__rst_paramRE.match(line)
-                        if match:
-                            # it's an rst param
-                            # last word is the param name
-                            param_declarations = match.group(4).rpartition(' ')
-                            line = "{} {} {} {}".format(
-                                param_declarations[2], param_declarations[0], param_declarations[1], match.group(5)
-                            )
-
+                        # We've got an "arguments" section
+                        line = line.replace(match.group(0), '').rstrip()
+                        if 'attr' in match.group(0).lower():
+                            prefix = '@property\t'
+                        else:
                             prefix = '@param\t'
-                            if lines:
-                                lines[-1], inCodeBlock = self._endCodeIfNeeded(lines[-1], inCodeBlock)
-                            lines.append('#@param\t' + line)
-                            continue  # line is processed
-                        match = AstWalker.__rst_typeRE.match(line)
-                        if match:
-                            # it's a type description to a former param
-                            line = "{}@n type of {}: {}".format(
-                                match.group(1), match.group(2), match.group(3)
-                            )  # @n = newline
-                            if lines:
-                                lines[-1], inCodeBlock = self._endCodeIfNeeded(lines[-1], inCodeBlock)
-                            lines.append('#' + line)
-                            continue  # line is processed
-                        match = AstWalker.__rst_returnRE.match(line)
-                        if match:
-                            # it's a return description line
-                            prefix = "@return\t"
-                            line = "@return {} {}".format(match.group(1), match.group(2))
-                            if lines:
-                                lines[-1], inCodeBlock = self._endCodeIfNeeded(lines[-1], inCodeBlock)
-                            lines.append('#' + line)
-                            continue  # line is processed
-                        match = AstWalker.__rst_rtypeRE.match(line)
-                        if match:
-                            # it's a return type description to a former return
-                            line = "{}@n return type of {}: {}".format(
-                                match.group(1), match.group(2), match.group(3)
-                            )  # @n = newline
-                            if lines:
-                                lines[-1], inCodeBlock = self._endCodeIfNeeded(lines[-1], inCodeBlock)
-                            lines.append('#' + line)
-                            continue  # line is processed
-                        match = AstWalker.__rst_tableRE.match(line)
-                        if match:
-                            # found a rst table start
-                            in_rst_table = True
-                            current_indent = len(line.expandtabs(self.args.tablength)) \
-                                - len(line.expandtabs(self.args.tablength).lstrip())
-                            rst_table_start_line_number = lineNum
-                            # get the positions of middle columns
-                            rst_table_middle_column_positions = []
-                            pos = line.find("= ")
-                            while pos != -1:
-                                rst_table_middle_column_positions.append(pos + 1)  # the space is after =
-                                pos = line.find("= ", pos + 1)
-                            # other code detectors need to be run here to get out of their mode but keep
-                            # line indention for not triggering a literal section!
-                            table_count += 1
-                            # <text> number prevents singleListItem detection later
-                            line = " " * current_indent + "Table {}".format(table_count)
+                        if inCodeBlock and lines:
+                            lines[-1], inCodeBlock = self._endCodeIfNeeded(lines[-1], inCodeBlock)
+                        inCodeBlockObj[0] = inCodeBlock
+                        lines.append('#' + line)
+                        continue
+                    if docLineKind == 'rstParam':
+                        # it's an rst param
+                        # last word is the param name
+                        param_declarations = match['paramDecl'].rpartition(' ')
+                        line = f"{param_declarations[2]} {param_declarations[0]} " \
+                            f"{param_declarations[1]} {match['paramDesc']}"
+
+                        prefix = '@param\t'
+                        if inCodeBlock and lines:
+                            lines[-1], inCodeBlock = self._endCodeIfNeeded(lines[-1], inCodeBlock)
+                        lines.append('#@param\t' + line)
+                        continue  # line is processed
+                    if docLineKind == 'rstType':
+                        # it's a type description to a former param
+                        line = f"{match['typeIndent']}@n type of {match['typeName']}: " \
+                            f"{match['typeDesc']}"  # @n = newline
+                        if inCodeBlock and lines:
+                            lines[-1], inCodeBlock = self._endCodeIfNeeded(lines[-1], inCodeBlock)
+                        lines.append('#' + line)
+                        continue  # line is processed
+                    if docLineKind == 'rstReturn':
+                        # it's a return description line
+                        prefix = "@return\t"
+                        line = f"@return {match['returnType']} {match['returnDesc']}"
+                        if inCodeBlock and lines:
+                            lines[-1], inCodeBlock = self._endCodeIfNeeded(lines[-1], inCodeBlock)
+                        lines.append('#' + line)
+                        continue  # line is processed
+                    if docLineKind == 'rstRtype':
+                        # it's a return type description to a former return
+                        line = f"{match['rtypeIndent']}@n return type of {match['rtypeName']}: " \
+                            f"{match['rtypeDesc']}"  # @n = newline
+                        if inCodeBlock and lines:
+                            lines[-1], inCodeBlock = self._endCodeIfNeeded(lines[-1], inCodeBlock)
+                        lines.append('#' + line)
+                        continue  # line is processed
+                    if docLineKind == 'rstTable':
+                        # found a rst table start
+                        in_rst_table = True
+                        current_indent = self._getIndentWidth(line, tabLength)
+                        rst_table_start_line_number = lineNum
+                        # get the positions of middle columns (in one scan of the line)
+                        rst_table_middle_column_positions = tuple(
+                            columnMatch.start() + 1  # the space is after =
+                            for columnMatch in AstWalker.__rst_tableColumnRE.finditer(line))
+                        # other code detectors need to be run here to get out of their mode but keep
+                        # line indention for not triggering a literal section!
+                        table_count += 1
+                        # <text> number prevents singleListItem detection later
+                        line = " " * current_indent + "Table {}".format(table_count)
+                        docLineKind = self.__nextDocLineKind(line, docLineKind)
+                    if docLineKind == 'args' and not inCodeBlock:
                         match = AstWalker.__argsRE.match(line)
-                        if match and not inCodeBlock:
-                            # We've got something that looks like an item /
-                            # description pair.
-                            if 'property' in prefix:
-                                line = '# {0}\t{1[name]}{2}# {1[desc]}'.format(
-                                    prefix, match.groupdict(), linesep)
-                            else:
-                                line = ' {0}\t{1[name]}\t{1[desc]}'.format(
-                                    prefix, match.groupdict())
+                        # We've got something that looks like an item /
+                        # description pair.
+                        if 'property' in prefix:
+                            line = f"# {prefix}\t{match['name']}{linesep}# {match['desc']}"
                         else:
+                            line = f" {prefix}\t{match['name']}\t{match['desc']}"
+                    else:
+                        if docLineKind == 'args':
+                            # Item / description pairs don't apply within code.
+                            docLineKind = self.__nextDocLineKind(line, docLineKind)
+                        if docLineKind == 'raisesStart':
                             match = AstWalker.__raisesStartRE.match(line)
-                            if match:
-                                line = line.replace(match.group(0), '').rstrip()
-                                if 'see' in match.group(1).lower():
-                                    # We've got a "see also" section
-                                    prefix = '@sa\t'
-                                else:
-                                    # We've got an "exceptions" section
-                                    prefix = '@exception\t'
+                            line = line.replace(match.group(0), '').rstrip()
+                            if 'see' in match.group(1).lower():
+                                # We've got a "see also" section
+                                prefix = '@sa\t'
+                            else:
+                                # We've got an "exceptions" section
+                                prefix = '@exception\t'
+                            if inCodeBlock:
                                 lines[-1], inCodeBlock = self._endCodeIfNeeded(
                                     lines[-1], inCodeBlock)
-                                inCodeBlockObj[0] = inCodeBlock
-                                lines.append('#' + line)
-                                continue
+                            inCodeBlockObj[0] = inCodeBlock
+                            lines.append('#' + line)
+                            continue
+                        if docLineKind == 'list' and not inCodeBlock:
                             match = AstWalker.__listRE.match(line)
-                            if match and not inCodeBlock:
-                                # We've got a list of something or another
-                                itemList = []
-                                for itemMatch in AstWalker.__listItemRE.findall(self._stripOutAnds(
-                                                                                match.group(0))):
-                                    itemList.append('# {0}\t{1}{2}'.format(
-                                        prefix, itemMatch, linesep))
-                                line = ''.join(itemList)[1:]
-                            else:
+                            # We've got a list of something or another
+                            itemList = []
+                            # The items are just the runs of word characters
+                            # and dots; everything between them is separators.
+                            items = self._stripOutAnds(match.group(0)).translate(AstWalker.__listSeparatorTable)
+                            for itemMatch in items.split():
+                                itemList.append(f'# {prefix}\t{itemMatch}{linesep}')
+                            line = ''.join(itemList)[1:]
+                        else:
+                            if docLineKind == 'list':
+                                docLineKind = self.__nextDocLineKind(line, docLineKind)
+                            if docLineKind == 'examplesStart' and lines[-1].strip() == '#' \
+                               and autocode:
                                 match = AstWalker.__examplesStartRE.match(line)
-                                if match and lines[-1].strip() == '#' \
-                                   and self.args.autocode:
-                                    # We've got an "example" section
-                                    inCodeBlock = True
-                                    inCodeBlockObj[0] = True
-                                    line = line.replace(match.group(0),
-                                                        ' @b Examples{0}# @code'.format(linesep))
-                                else:
+                                # We've got an "example" section
+                                inCodeBlock = True
+                                inCodeBlockObj[0] = True
+                                line = line.replace(match.group(0), AstWalker.__examplesHeading)
+                            else:
+                                if docLineKind == 'examplesStart':
+                                    docLineKind = self.__nextDocLineKind(line, docLineKind)
+                                if docLineKind == 'sectionStart':
                                     match = AstWalker.__sectionStartRE.match(line)
-                                    if match:
-                                        # We've got an arbitrary section
-                                        prefix = ''
-                                        inSection = True
-                                        # What's the indentation of the section heading?
-                                        sectionHeadingIndent = len(line.expandtabs(self.args.tablength)) \
-                                            - len(line.expandtabs(self.args.tablength).lstrip())
-                                        line = line.replace(
-                                            match.group(0),
-                                            ' @par {0}'.format(match.group(1))
-                                        )
-                                        if lines[-1] == '# @par':
-                                            lines[-1] = '#'
-                                        lines[-1], inCodeBlock = self._endCodeIfNeeded(
-                                            lines[-1], inCodeBlock)
-                                        inCodeBlockObj[0] = inCodeBlock
-                                        lines.append('#' + line)
-                                        continue
-                                    if prefix:
-                                        match = AstWalker.__singleListItemRE.match(line)
-                                        if match and not inCodeBlock:
-                                            # Probably a single list item
-                                            line = ' {0}\t{1}'.format(
-                                                prefix, match.group(0))
-                                        elif self.args.autocode:
-                                            codeChecker.send(
-                                                (
-                                                    line, lines,
-                                                    lineNum - firstLineNum
-                                                )
-                                            )
-                                            inCodeBlock = inCodeBlockObj[0]
-                                    else:
-                                        if self.args.autocode:
-                                            codeChecker.send(
-                                                (
-                                                    line, lines,
-                                                    lineNum - firstLineNum
-                                                )
-                                            )
-                                            inCodeBlock = inCodeBlockObj[0]
-
-                # If we were passed a tail, append it to the docstring.
-                # Note that this means that we need a docstring for this
-                # item to get documented.
-                if tail and lineNum == len(self.docLines) - 1:
-                    line = '{0}{1}# {2}'.format(line.rstrip(), linesep, tail)
-
-                # Add comment marker for every line.
-                line = '#{0}'.format(line.rstrip())
-                # Ensure the first line has the Doxygen double comment.
-                if lineNum == 0:
-                    line = '#' + line
-
-                lines.append(line.replace(' ' + linesep, linesep))
-            else:
-                # If we get our sentinel value, send out what we've got.
-                timeToSend = True
+                                    # We've got an arbitrary section
+                                    prefix = ''
+                                    inSection = True
+                                    # What's the indentation of the section heading?
+                                    sectionHeadingIndent = self._getIndentWidth(line, tabLength)
+                                    line = line.replace(
+                                        match.group(0),
+                                        ' @par {0}'.format(match.group(1))
+                                    )
+                                    lastLine = lines[-1]
+                                    if lastLine == '# @par':
+                                        lastLine = '#'
+                                    lines[-1], inCodeBlock = self._endCodeIfNeeded(
+                                        lastLine, inCodeBlock)
+                                    inCodeBlockObj[0] = inCodeBlock
+                                    lines.append('#' + line)
+                                    continue
+                                if prefix:
+                                    match = matchSingleListItem(line)
+                                    if match and not inCodeBlock:
+                                        # Probably a single list item
+                                        line = f' {prefix}\t{match.group(0)}'
+                                    elif autocode:
+                                        codeChecker.feed(line, lines, lineNum - firstLineNum)
+                                        inCodeBlock = inCodeBlockObj[0]
+                                else:
+                                    if autocode:
+                                        codeChecker.feed(line, lines, lineNum - firstLineNum)
+                                        inCodeBlock = inCodeBlockObj[0]
+
+            # If we were passed a tail, append it to the docstring.
+            # Note that this means that we need a docstring for this
+            # item to get documented.
+            if tail and lineNum == len(self.docLines) - 1:
+                line = f'{line.rstrip()}{linesep}# {tail}'
+
+            # Add comment marker for every line.
+            line = '#' + line.rstrip()
+            # Ensure the first line has the Doxygen double comment.
+            if lineNum == 0:
+                line = '#' + line
+
+            lines.append(line.replace(' ' + linesep, linesep))
 
             if timeToSend:
-                if lines:
+                if inCodeBlock and lines:
                     lines[-1], inCodeBlock = self._endCodeIfNeeded(lines[-1], inCodeBlock)
                 inCodeBlockObj[0] = inCodeBlock
-                writer.send((firstLineNum, lineNum, lines))
+                batchFirstLineNums.append(firstLineNum)
+                batchLastLineNums.append(lineNum)
+                batchLines.append(lines)
                 lines = []
                 firstLineNum = -1
                 table_count = 0
                 timeToSend = False
 
-    @coroutine
-    def __writeDocstring(self):
+        # Once we've run out of lines, send out what we've got.
+        if firstLineNum < 0:
+            firstLineNum = len(self.docLines) - 1
+        if inCodeBlock and lines:
+            lines[-1], inCodeBlock = self._endCodeIfNeeded(lines[-1], inCodeBlock)
+        batchFirstLineNums.append(firstLineNum)
+        batchLastLineNums.append(len(self.docLines) - 1)
+        batchLines.append(lines)
+        return batchFirstLineNums, batchLastLineNums, batchLines
+
+    def __commentDocstring(self, tail=''):
+        """
+        Process the docstring lines without looking at their contents.
+
+        This is all __alterDocstring amounts to when autobrief is off (or the
+        docstring is a single line without anything special in it): each
+        line is simply turned into a comment, the first one with the Doxygen
+        double comment, and any tail is appended.  As there is only ever the
+        one batch covering the whole docstring, the new docstring lines are
+        returned directly.
         """
-        Run eternally, dumping out docstring line batches as they get fed in.
+        lines = list(self.docLines)
+        if tail:
+            lines[-1] = f'{lines[-1].rstrip()}{linesep}# {tail}'
+        lines = [('#' + line.rstrip()).replace(' ' + linesep, linesep) for line in lines]
+        lines[0] = '#' + lines[0]
+        return lines
+
+    def __applyDocEdits(self, batchFirstLineNums, batchLastLineNums, batchLines):
+        """
+        Substitute the collected batches for the original docstring lines.
 
-        Replaces original batches of docstring lines with modified versions
-        fed in via send.
+        Rather than splicing each batch into the docstring as it arrives, the
+        new docstring is built with a single walk over the batches, carrying
+        over any untouched original lines in between.  Batches are padded out
+        with blank lines to the size of the block they replace, and should a
+        later batch start within an earlier one it takes precedence.
         """
-        while True:
-            firstLineNum, lastLineNum, lines = (yield)
-            newDocstringLen = lastLineNum - firstLineNum + 1
-            while len(lines) < newDocstringLen:
-                lines.append('')
-            # Substitute the new block of lines for the original block of lines.
-            self.docLines[firstLineNum: lastLineNum + 1] = lines
-
-    def _processDocstring(self, node, tail='', **kwargs):
+        docLines = []
+        for firstLineNum, lastLineNum, lines in zip(batchFirstLineNums, batchLastLineNums, batchLines):
+            if firstLineNum < len(docLines):
+                del docLines[firstLineNum:]
+            else:
+                docLines.extend(self.docLines[len(docLines): firstLineNum])
+            docLines.extend(lines)
+            docLines.extend([''] * (lastLineNum - firstLineNum + 1 - len(lines)))
+        docLines.extend(self.docLines[len(docLines):])
+        self.docLines = docLines
+
+    def _processDocstring(self, node, tail='', containingNodes=None):
         """
         Handle a docstring for functions, classes, and modules.
 
@@ -532,6 +827,7 @@ class AstWalker(NodeVisitor):
         Return: last line number of this docstring
         """
         typeName = type(node).__name__
+        autobrief = self.args.autobrief
         # Modules don't have lineno defined, but it's always 0 for them.
         curLineNum = startLineNum = 0
         if typeName != 'Module':
@@ -549,11 +845,11 @@ class AstWalker(NodeVisitor):
         if not AstWalker.__docstrOneLineRE.match(line):
             # Skip for the special case of a single-line docstring.
             curLineNum += 1
-            while curLineNum < len(self.lines):
-                line = self.lines[curLineNum]
-                if line.find(match.group(2)) >= 0:
-                    break
-                curLineNum += 1
+            numLines = len(self.lines)
+            if curLineNum < numLines:
+                quote = match.group(2)
+                while curLineNum < numLines and quote not in self.lines[curLineNum]:
+                    curLineNum += 1
         endLineNum = curLineNum + 1
 
         # Isolate our enclosing object's declaration.
@@ -568,27 +864,30 @@ class AstWalker(NodeVisitor):
                                                               self.docLines[0])
             self.docLines[-1] = AstWalker.__docstrMarkerRE.sub('',
                                                                self.docLines[-1])
-            # Handle special strings within the docstring.
-            docstringConverter = self.__alterDocstring(
-                tail, self.__writeDocstring())
-            for lineInfo in enumerate(self.docLines):
-                docstringConverter.send(lineInfo)
-            docstringConverter.send((len(self.docLines) - 1, None))
+            # Handle special strings within the docstring.  A single line
+            # without any just becomes a comment, as no code block can start
+            # or end within it either.
+            if autobrief and (len(self.docLines) > 1 or
+                              AstWalker.__singleLineRE.match(self.docLines[0]) or
+                              AstWalker.__docLineRE.match(self.docLines[0])):
+                self.__applyDocEdits(*self.__alterDocstring(tail))
+            else:
+                self.docLines = self.__commentDocstring(tail)
 
         # Add a Doxygen @brief tag to any single-line description.
         # but take care not to remove the initial '##' doxygen marker
-        if self.args.autobrief:
+        if autobrief:
             safetyCounter = 0
-            while self.docLines and self.docLines[0].lstrip('#').strip() == '':
+            while self.docLines and self._isBlankComment(self.docLines[0]):
                 del self.docLines[0]
                 self.docLines.append('')
                 safetyCounter += 1
                 if safetyCounter >= len(self.docLines):
                     # Escape the effectively empty docstring.
                     break
+            secondLine = self.docLines[1].strip(AstWalker.__commentBlankChars) if len(self.docLines) >= 2 else ''
             if len(self.docLines) == 1 or (len(self.docLines) >= 2 and (
-                self.docLines[1].strip(whitespace + '#') == '' or
-                    self.docLines[1].strip(whitespace + '#').startswith('@'))):
+                    not secondLine or secondLine.startswith('@'))):
                 self.docLines[0] = "## @brief {0}".format(self.docLines[0].lstrip('#'))
                 if len(self.docLines) > 1 and self.docLines[1] == '# @par':
                     self.docLines[1] = '#'
@@ -600,13 +899,17 @@ class AstWalker(NodeVisitor):
         if defLines:
             # make all docstring comments on same indentation as their enclosing object's indention level
             # but remove this added indent within the docstring if needed
-            match = AstWalker.__indentRE.match(defLines[0])
-            indentStr = match.group(1) if match else ''
-            self.docLines = [AstWalker.__newlineRE.sub(indentStr + '#', docLine)
-                             for docLine in self.docLines]
+            indentStr = self._getIndent(defLines[0])
+            if indentStr:
+                # Indent the comment marker starting each (embedded) line.
+                newlineMarker = '\n' + indentStr + '#'
+                self.docLines = [
+                    (indentStr if docLine.startswith('#') else '') + docLine.replace('\n#', newlineMarker)
+                    for docLine in self.docLines
+                ]
             if self.args.equalIndent and indentStr:
                 # remove the same amount of indent within the docLine part
-                indentPartRE = regexpCompile("{istr}#+({istr})".format(istr=indentStr))
+                indentPartRE = _indentPartRE(indentStr)
                 for (index, docLine) in enumerate(self.docLines):
                     docIndentPart = indentPartRE.match(docLine)
                     if docIndentPart is None:
@@ -621,19 +924,20 @@ class AstWalker(NodeVisitor):
         # Here we manually insert a pass statement to rectify this problem.
         if typeName != 'Module':
             if docstringStart < len(self.lines):
-                match = AstWalker.__indentRE.match(self.lines[docstringStart])
-                indentStr = match.group(1) if match else ''
+                indentStr = self._getIndent(self.lines[docstringStart])
             else:
                 indentStr = ''
-            containingNodes = kwargs.get('containingNodes', []) or []
-            fullPathNamespace = self._getFullPathName(containingNodes)
-            parentType = fullPathNamespace[-2][1]
+            # Look at the types of the innermost containing nodes directly
+            # (the module itself being the outermost one).
+            containingNodes = containingNodes or []
+            parentType = containingNodes[-2][1] if len(containingNodes) > 1 else 'module'
+            nodeType = containingNodes[-1][1] if containingNodes else 'module'
             if parentType == 'interface' and typeName == 'FunctionDef' \
-               or fullPathNamespace[-1][1] == 'interface':
+               or nodeType == 'interface':
                 # defLines should always end with some kind of new line -> insert two os correct ones
                 defLines[-1] = '{0}{1}{1}{2}pass'.format(defLines[-1].rstrip(),
                                                          linesep, indentStr)
-            elif self.args.autobrief and typeName == 'ClassDef':
+            elif autobrief and typeName == 'ClassDef':
                 # If we're parsing docstrings separate out class attribute
                 # definitions to get better Doxygen output.
                 for firstVarLineNum, firstVarLine in enumerate(self.docLines):
@@ -650,13 +954,11 @@ class AstWalker(NodeVisitor):
                         indentLineNum = endLineNum
                         indentStr = ''
                         while not indentStr and indentLineNum < len(self.lines):
-                            match = AstWalker.__indentRE.match(self.lines[indentLineNum])
-                            indentStr = match.group(1) if match else ''
+                            indentStr = self._getIndent(self.lines[indentLineNum])
                             indentLineNum += 1
-                        varLines = ['{0}{1}'.format(linesep, docLine).replace(
-                                    linesep, linesep + indentStr)
-                                    for docLine in self.docLines[
-                                        firstVarLineNum: lastVarLineNum]]
+                        indentedLinesep = linesep + indentStr
+                        varLines = [indentedLinesep + docLine.replace(linesep, indentedLinesep)
+                                    for docLine in self.docLines[firstVarLineNum: lastVarLineNum]]
                         defLines.extend(varLines)
                         self.docLines[firstVarLineNum: lastVarLineNum] = []
                         # After the property shuffling we will need to relocate
@@ -676,6 +978,28 @@ class AstWalker(NodeVisitor):
         return endLineNum
 
     @staticmethod
+    def _hasDocstring(node):
+        """
+        See if a module, class, or function has a docstring worth processing.
+
+        This gives the same answer as checking the result of get_docstring,
+        but without having it clean up a copy of the docstring just to throw
+        it away again.  Only a docstring made up solely of whitespace can be
+        cleaned up to nothing (though a multi-line one may keep some of its
+        indentation), so only those get cleaned up to check.
+        """
+        if not node.body or not isinstance(node.body[0], Expr):
+            return False
+        docNode = node.body[0].value
+        if not isinstance(docNode, Constant) or not isinstance(docNode.value, str):
+            return False
+        docstring = docNode.value
+        if docstring.isspace():
+            # Such docstrings are rare, so don't load inspect unless needed.
+            from inspect import cleandoc
+            docstring = cleandoc(docstring)
+        return docstring != ''
+
     def _checkMemberName(name):
         """
         See if a member name indicates that it should be private.
@@ -684,7 +1008,8 @@ class AstWalker(NodeVisitor):
         not ending in a double underscore) and bed lumps (variables that
         are not really private but are by common convention treated as
         protected because they begin with a single underscore) get Doxygen
-        tags labeling them appropriately.
+        tags labeling them appropriately.  The same few names turn up over
+        and over again (self, __init__, ...) so the answers are cached.
         """
         assert isinstance(name, str)
         restrictionLevel = None
@@ -695,6 +1020,10 @@ class AstWalker(NodeVisitor):
                 restrictionLevel = 'protected'
         return restrictionLevel
 
+    # Cython applies a stacked staticmethod first, which would leave the cache
+    # wrapping the descriptor, so the decorators are applied by hand instead.
+    _checkMemberName = staticmethod(lru_cache(maxsize=4096)(_checkMemberName))
+
     def _processMembers(self, node, contextTag):
         """
         Mark up members if they should be private.
@@ -704,31 +1033,59 @@ class AstWalker(NodeVisitor):
         """
         restrictionLevel = self._checkMemberName(node.name)
         if restrictionLevel:
-            workTag = '{0}{1}# @{2}'.format(contextTag,
-                                            linesep,
-                                            restrictionLevel)
+            workTag = f'{contextTag}{linesep}# @{restrictionLevel}'
         else:
             workTag = contextTag
         return workTag
 
-    def generic_visit(self, node, **kwargs):
+    def _getChildFields(self, nodeClass):
+        """
+        Work out which fields of a node class generic_visit should look in.
+
+        These are the fields of the class that might hold nodes of interest,
+        i.e. leaving out those that never hold nodes at all (along with the
+        value of a constant) and, when only statements are of interest, any
+        that can't hold statements.
+        """
+        if self._walkEverything:
+            return nodeClass._fields
+        if self._childFields is not None:
+            return tuple(field for field in nodeClass._fields if field in self._childFields)
+        if nodeClass is Constant:
+            return ()
+        return tuple(field for field in nodeClass._fields if field not in AstWalker.__leafFields)
+
+    def generic_visit(self, node, containingNodes=None):
         """
         Extract useful information from relevant nodes including docstrings.
 
         This is virtually identical to the standard version contained in
         NodeVisitor.  It is only overridden because we're tracking extra
         information (the hierarchy of containing nodes) not preserved in
-        the original.
+        the original.  Child nodes are dispatched inline rather than via
+        visit, and nodes without any fields (expression contexts, operators)
+        are skipped outright as they can't contain anything of interest.
+        Likewise, when parseLines has found there to be no calls worth
+        checking, only the fields that can hold statements are descended into.
+        Which fields to look in is worked out just once for each node class.
+        None of this skipping happens for subclasses with handlers of their
+        own, which get to see every node just like with NodeVisitor.
         """
-        for field, value in iter_fields(node):
+        visitors = self._visitors
+        walkEverything = self._walkEverything
+        childFields = self._childFieldsByClass.get(node.__class__)
+        if childFields is None:
+            childFields = self._childFieldsByClass[node.__class__] = self._getChildFields(node.__class__)
+        for field in childFields:
+            value = getattr(node, field, None)
             if isinstance(value, list):
                 for item in value:
-                    if isinstance(item, AST):
-                        self.visit(item, containingNodes=kwargs['containingNodes'])
-            elif isinstance(value, AST):
-                self.visit(value, containingNodes=kwargs['containingNodes'])
+                    if isinstance(item, AST) and (item._fields or walkEverything):
+                        visitors[item.__class__](item, containingNodes)
+            elif isinstance(value, AST) and (value._fields or walkEverything):
+                visitors[value.__class__](value, containingNodes)
 
-    def visit(self, node, **kwargs):
+    def visit(self, node, containingNodes=None):
         """
         Visit a node and extract useful information from it.
 
@@ -737,10 +1094,9 @@ class AstWalker(NodeVisitor):
         information (the hierarchy of containing nodes) not preserved in
         the original.
         """
-        containingNodes = kwargs.get('containingNodes', [])
-        method = 'visit_' + node.__class__.__name__
-        visitor = getattr(self, method, self.generic_visit)
-        return visitor(node, containingNodes=containingNodes)
+        if containingNodes is None:
+            containingNodes = []
+        return self._visitors[node.__class__](node, containingNodes)
 
     def _getFullPathName(self, containingNodes):
         """
@@ -752,29 +1108,41 @@ class AstWalker(NodeVisitor):
         assert isinstance(containingNodes, list)
         return [(self.args.fullPathNamespace, 'module')] + containingNodes
 
-    def visit_Module(self, node, **kwargs):
+    def _getContextTag(self, containingNodes):
+        """
+        Return the dotted name of the innermost of the containing nodes.
+
+        This is the full path name joined up into a Doxygen namespace, built
+        straight from the node names without putting together the full path
+        list first.
+        """
+        if not containingNodes:
+            return self.args.fullPathNamespace
+        return self.args.fullPathNamespace + '.' + '.'.join([name for name, _ in containingNodes])
+
+    def visit_Module(self, node, containingNodes=None):
         """
         Handle the module-level docstring.
 
         Process the module-level docstring and create appropriate Doxygen tags
         if autobrief option is set.
         """
-        containingNodes = kwargs.get('containingNodes', [])
+        if containingNodes is None:
+            containingNodes = []
         if self.args.debug:
             stderr.write("# Module {0}{1}".format(self.args.fullPathNamespace,
                                                   linesep))
-        if get_docstring(node):
+        if self._hasDocstring(node):
             if self.args.topLevelNamespace:
-                fullPathNamespace = self._getFullPathName(containingNodes)
-                contextTag = '.'.join(pathTuple[0] for pathTuple in fullPathNamespace)
+                contextTag = self._getContextTag(containingNodes)
                 tail = '@namespace {0}'.format(contextTag)
             else:
                 tail = ''
             self._processDocstring(node, tail)
         # Visit any contained nodes (in this case pretty much everything).
-        self.generic_visit(node, containingNodes=containingNodes)
+        self.generic_visit(node, containingNodes)
 
-    def visit_Assign(self, node, **kwargs):
+    def visit_Assign(self, node, containingNodes=None):
         """
         Handle assignments within code.
 
@@ -786,37 +1154,30 @@ class AstWalker(NodeVisitor):
         """
         lineNum = node.lineno - 1
         # Assignments have one Doxygen-significant special case:
-        # interface attributes.
-        match = AstWalker.__attributeRE.match(self.lines[lineNum])
+        # interface attributes.  Most assignments aren't, so a plain substring
+        # test screens them out before the full regex gets involved.
+        line = self.lines[lineNum]
+        match = self._mayHaveAttributes and 'attribute' in line.lower() and \
+            AstWalker.__attributeRE.match(line)
         if match:
-            self.lines[lineNum] = '{0}## @property {1}{2}{0}# {3}{2}' \
-                '{0}# @hideinitializer{2}{4}{2}'.format(
-                    match.group(1),
-                    match.group(2),
-                    linesep,
-                    match.group(3),
-                    self.lines[lineNum].rstrip()
-            )
+            indentStr = match.group(1)
+            self.lines[lineNum] = f'{indentStr}## @property {match.group(2)}{linesep}' \
+                f'{indentStr}# {match.group(3)}{linesep}' \
+                f'{indentStr}# @hideinitializer{linesep}{line.rstrip()}{linesep}'
             if self.args.debug:
                 stderr.write("# Attribute {0.id}{1}".format(node.targets[0],
                                                             linesep))
         if isinstance(node.targets[0], Name):
-            match = AstWalker.__indentRE.match(self.lines[lineNum])
-            indentStr = match.group(1) if match else ''
             restrictionLevel = self._checkMemberName(node.targets[0].id)
             if restrictionLevel:
-                self.lines[lineNum] = '{0}## @var {1}{2}{0}' \
-                    '# @hideinitializer{2}{0}# @{3}{2}{4}{2}'.format(
-                        indentStr,
-                        node.targets[0].id,
-                        linesep,
-                        restrictionLevel,
-                        self.lines[lineNum].rstrip()
-                )
+                indentStr = self._getNodeIndent(self.lines[lineNum], node)
+                self.lines[lineNum] = f'{indentStr}## @var {node.targets[0].id}{linesep}' \
+                    f'{indentStr}# @hideinitializer{linesep}' \
+                    f'{indentStr}# @{restrictionLevel}{linesep}{self.lines[lineNum].rstrip()}{linesep}'
         # Visit any contained nodes.
-        self.generic_visit(node, containingNodes=kwargs['containingNodes'])
+        self.generic_visit(node, containingNodes)
 
-    def visit_Call(self, node, **kwargs):
+    def visit_Call(self, node, containingNodes=None):
         """
         Handle function calls within code.
 
@@ -824,21 +1185,29 @@ class AstWalker(NodeVisitor):
         in addition to their normal use.  If a call appears to mark an
         implementation, it gets labeled as such for Doxygen.
         """
+        if not self._mayHaveImplements:
+            # Nothing in the source could be an implementation declaration.
+            self.generic_visit(node, containingNodes)
+            return
         lineNum = node.lineno - 1
         # Function calls have one Doxygen-significant special case:  interface
-        # implementations.
-        match = AstWalker.__implementsRE.match(self.lines[lineNum])
+        # implementations.  As with assignments, a cheap substring test lets
+        # the vast majority of calls skip the full regex.
+        line = self.lines[lineNum]
+        lowerLine = line.lower()
+        match = ('implements(' in lowerLine or 'provides(' in lowerLine) and \
+            AstWalker.__implementsRE.match(line)
         if match:
-            self.lines[lineNum] = '{0}## @implements {1}{2}{0}{3}{2}'.format(
-                match.group(1), match.group(2), linesep,
-                self.lines[lineNum].rstrip())
+            indentStr = match.group(1)
+            self.lines[lineNum] = f'{indentStr}## @implements {match.group(2)}{linesep}' \
+                f'{indentStr}{line.rstrip()}{linesep}'
             if self.args.debug:
                 stderr.write("# Implements {0}{1}".format(match.group(1),
                                                           linesep))
         # Visit any contained nodes.
-        self.generic_visit(node, containingNodes=kwargs['containingNodes'])
+        self.generic_visit(node, containingNodes)
 
-    def visit_FunctionDef(self, node, **kwargs):
+    def visit_FunctionDef(self, node, containingNodes=None):
         """
         Handle function definitions within code.
 
@@ -851,40 +1220,41 @@ class AstWalker(NodeVisitor):
         # if it's a property, rewrite the definition to something Doxygen understands
         # (We'll use the getter for the documentation)
         if node.decorator_list:
-            match = AstWalker.__indentRE.match(self.lines[node.lineno - 1])
-            indentStr = match.group(1) if match else ''
-            if getattr(node.decorator_list[0], "id", None) == "property":
-                self.lines[node.lineno - 1] = indentStr + "{} = property".format(node.name) + \
-                    linesep + indentStr + "## \\private" + linesep + self.lines[node.lineno - 1]
-            if getattr(node.decorator_list[0], "attr", None) == "setter":
-                self.lines[node.lineno - 1] = indentStr + "## \\private" + linesep + self.lines[node.lineno - 1]
+            isProperty = getattr(node.decorator_list[0], "id", None) == "property"
+            isSetter = getattr(node.decorator_list[0], "attr", None) == "setter"
+            if isProperty or isSetter:
+                indentStr = self._getNodeIndent(self.lines[node.lineno - 1], node)
+            if isProperty:
+                self.lines[node.lineno - 1] = f"{indentStr}{node.name} = property{linesep}" \
+                    f"{indentStr}## \\private{linesep}{self.lines[node.lineno - 1]}"
+            if isSetter:
+                self.lines[node.lineno - 1] = f"{indentStr}## \\private{linesep}{self.lines[node.lineno - 1]}"
 
         # Push either 'interface' or 'class' onto our containing nodes
         # hierarchy so we can keep track of context.  This will let us tell
         # if a function is nested within another function or even if a class
         # is nested within a function.
-        containingNodes = kwargs.get('containingNodes') or []
+        containingNodes = containingNodes or []
         containingNodes.append((node.name, 'function'))
         if self.args.topLevelNamespace:
-            fullPathNamespace = self._getFullPathName(containingNodes)
-            contextTag = '.'.join(pathTuple[0] for pathTuple in fullPathNamespace)
+            contextTag = self._getContextTag(containingNodes)
             modifiedContextTag = self._processMembers(node, contextTag)
             tail = '@namespace {0}'.format(modifiedContextTag)
         else:
             tail = self._processMembers(node, '')
-        if get_docstring(node):
+        if self._hasDocstring(node):
             last_doc_line_number = self._processDocstring(
                 node, tail, containingNodes=containingNodes)
             if self.args.keepDecorators:
                 self._shift_decorators_below_docstring(node, last_doc_line_number)
 
         # Visit any contained nodes.
-        self.generic_visit(node, containingNodes=containingNodes)
+        self.generic_visit(node, containingNodes)
         # Remove the item we pushed onto the containing nodes hierarchy.
         containingNodes.pop()
     visit_AsyncFunctionDef = visit_FunctionDef
 
-    def visit_ClassDef(self, node, **kwargs):
+    def visit_ClassDef(self, node, containingNodes=None):
         """
         Handle class definitions within code.
 
@@ -899,18 +1269,20 @@ class AstWalker(NodeVisitor):
         # hierarchy so we can keep track of context.  This will let us tell
         # if a function is a method or an interface method definition or if
         # a class is fully contained within another class.
-        containingNodes = kwargs.get('containingNodes') or []
+        containingNodes = containingNodes or []
 
         if not self.args.object_respect:
             # Remove object class of the inherited class list to avoid that all
             # new-style class inherits from object in the hierarchy class
+            # class.  That's only worth matching when "(object):" is there.
             line = self.lines[lineNum]
-            match = AstWalker.__classRE.match(line)
+            match = '(object):' in line and AstWalker.__classRE.match(line)
             if match:
                 if match.group(2) == 'object':
                     self.lines[lineNum] = line[:match.start(2)] + line[match.end(2):]
 
-        match = AstWalker.__interfaceRE.match(self.lines[lineNum])
+        line = self.lines[lineNum]
+        match = 'interface' in line.lower() and AstWalker.__interfaceRE.match(line)
         if match:
             if self.args.debug:
                 stderr.write("# Interface {0.name}{1}".format(node, linesep))
@@ -920,8 +1292,7 @@ class AstWalker(NodeVisitor):
                 stderr.write("# Class {0.name}{1}".format(node, linesep))
             containingNodes.append((node.name, 'class'))
         if self.args.topLevelNamespace:
-            fullPathNamespace = self._getFullPathName(containingNodes)
-            contextTag = '.'.join(pathTuple[0] for pathTuple in fullPathNamespace)
+            contextTag = self._getContextTag(containingNodes)
             tail = '@namespace {0}'.format(contextTag)
         else:
             tail = ''
@@ -934,24 +1305,16 @@ class AstWalker(NodeVisitor):
         else:
             contextTag = tail
         contextTag = self._processMembers(node, contextTag)
-        if get_docstring(node):
+        if self._hasDocstring(node):
             last_doc_line_number = self._processDocstring(
                 node, contextTag, containingNodes=containingNodes)
             if self.args.keepDecorators:
                 self._shift_decorators_below_docstring(node, last_doc_line_number)
         # Visit any contained nodes.
-        self.generic_visit(node, containingNodes=containingNodes)
+        self.generic_visit(node, containingNodes)
         # Remove the item we pushed onto the containing nodes hierarchy.
         containingNodes.pop()
 
-    # With Python 3.8, a function visit_Constant() was added to ast.NodeVisitor
-    # This adds an overload of this function that can take additional
-    # arguments, but ignores them and calls the function from NodeVisitor.
-    # See also https://github.com/Feneric/doxypypy/issues/70
-    def visit_Constant(self, node, **kwargs):
-        """Handle constant definitions within code."""
-        super(AstWalker, self).visit_Constant(node)
-
     def _shift_decorators_below_docstring(self, node, last_doc_line_number):
         if node.decorator_list:
             # get the decorators of this function and put them after DocString -> needs doxygen 1.9 or higher
@@ -966,7 +1329,18 @@ class AstWalker(NodeVisitor):
 
     def parseLines(self):
         """Form an AST for the code and produce a new version of the source."""
-        inAst = parse(''.join(self.lines), self.args.filename)
+        source = self.source if self.source is not None else ''.join(self.lines)
+        inAst = parse(source, self.args.filename)
+        # Most code never mentions interfaces, in which case there's no point
+        # in checking every single assignment and call for them.
+        lowerSource = source.lower()
+        self._mayHaveAttributes = 'attribute' in lowerSource
+        self._mayHaveImplements = 'implements(' in lowerSource or 'provides(' in lowerSource
+        # Without any calls to look at, only the statements matter and the
+        # (far more numerous) expression nodes needn't be walked at all.
+        if not self._mayHaveImplements and not self._walkEverything:
+            self._childFields = AstWalker.__statementFields
+        self._childFieldsByClass.clear()
         # Visit all the nodes in our tree and apply Doxygen tags to the source.
         self.visit(inAst)
 
@@ -974,15 +1348,128 @@ class AstWalker(NodeVisitor):
         """Return the modified file once processing has been completed."""
         # Note: some processing steps insert new lines within one lines.line...
         # so actually all lineseps need to be replaced within one line, even in the middle of a line ...
-        return linesep.join(line.rstrip() for line in self.lines)
+        return linesep.join(map(str.rstrip, self.lines))
+
+    def iterLines(self):
+        """
+        Iterate over the lines of the modified file once processing is done.
+
+        Unlike getLines, this splits up the lines some processing steps
+        packed several lines into, stripping each one, so the caller gets
+        exactly the lines of the output without a copy of the whole file.
+        """
+        for line in self.lines:
+            line = line.rstrip()
+            if linesep in line:
+                yield from map(str.rstrip, line.split(linesep))
+            else:
+                yield line
+
+
+def _decodeUtf8(rawSource):
+    """
+    Decode the raw contents of a file if they are UTF-8.
+
+    Most Python sources are plain UTF-8 (or just ASCII), so try that first
+    and spare ourselves sniffing the encoding.  The result is what reading
+    the file in text mode would give, i.e. without any BOM and with
+    universal newlines applied.  Returns None if the contents aren't UTF-8
+    or contain NUL bytes, which UTF-16 and UTF-32 encoded ASCII would.
+    """
+    if b'\0' in rawSource:
+        return None
+    if rawSource.startswith(BOM_UTF8):
+        rawSource = rawSource[len(BOM_UTF8):]
+    try:
+        source = rawSource.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    if '\r' in source:
+        source = source.replace('\r\n', '\n').replace('\r', '\n')
+    return source
+
+
+def _detectEncoding(sampleBytes):
+    """
+    Guess the encoding of a sample of bytes.
+
+    This uses cchardet (a much faster C implementation of chardet) if it's
+    installed and chardet otherwise.  Either takes longer to import than
+    filtering a typical file does, which is why that only happens here, once
+    it's clear the file isn't UTF-8.  As they don't agree on how to spell
+    encodings, the name is normalized to that of the Python codec; 'ascii'
+    is returned if nothing could be made of it.
+    """
+    try:
+        from cchardet import detect
+    except ImportError:
+        from chardet import detect
+    return codecLookup(detect(sampleBytes)['encoding'] or 'ascii').name
+
+
+def filterFile(args):
+    """
+    Filter a single file.
+
+    Reads the file given by args.filename, figures out its encoding, and
+    returns the modified source produced by running it through an AstWalker
+    with the given options.  This is the unit of work main hands out when
+    processing several files at once.
+    """
+    # Read the raw contents of the input file in one go.
+    with open(args.filename, 'rb') as inFile:
+        rawSource = inFile.read()
+
+    source = _decodeUtf8(rawSource)
+    if source is None:
+        # Figure out encoding of input file.
+        sampleBytes = rawSource[:32]
+        encoding = _detectEncoding(sampleBytes)
+
+        # Switch to generic versions to strip the BOM automatically.
+        if sampleBytes.startswith(BOM_UTF8):
+            encoding = 'utf-8-sig'
+        if encoding.startswith("utf-16"):
+            encoding = "utf-16"
+        elif encoding.startswith("utf-32"):
+            encoding = "utf-32"
+
+        # Decode what we read just as opening the file in text mode would have.
+        source = TextIOWrapper(BytesIO(rawSource), encoding=None if encoding == 'ascii' else encoding).read()
+    # Only split on real newlines; splitlines would also break lines on
+    # form feeds and the like, which are just whitespace in Python code.
+    lines = StringIO(source).readlines()
+    # Create the abstract syntax tree for the input file.
+    astWalker = AstWalker(lines, args, source)
+    astWalker.parseLines()
+
+    # There is a "feature" in print on Windows. If linesep is
+    # passed, it will generate 0x0D 0x0D 0x0A each line which
+    # screws up Doxygen since it's expected 0x0D 0x0A line endings.
+    # Hand back plain newlines and leave the rest to print.
+    return '\n'.join(astWalker.iterLines())
+
+
+def writeOutput(args, output):
+    """
+    Hand out the filtered output of a single file.
+
+    Normally it's just printed, but in batch mode it's written to a file
+    named after the input file given by args.filename with .out appended.
+    """
+    if args.batch:
+        with open(args.filename + '.out', 'w', encoding='utf-8') as outFile:
+            print(output, file=outFile)
+    else:
+        print(output)
 
 
 def main():
     """
     Start it up.
 
-    Starts the parser on the file given by the filename as the first
-    argument on the command line.
+    Starts the parser on each of the files given on the command line,
+    printing the results one after the other.
     """
     def argParse():
         """
@@ -995,10 +1482,10 @@ def main():
         """
         prog = basename(argv[0])
         parser = ArgumentParser(prog=prog,
-                                usage="%(prog)s [options] filename")
+                                usage="%(prog)s [options] filename [filename ...]")
 
         parser.add_argument(
-            "filename",
+            "filenames", nargs="+", metavar="filename",
             help="Input file name"
         )
         parser.add_argument(
@@ -1047,6 +1534,17 @@ def main():
                  "With this option decorators are kept before it's definition string"
                  "(function or class names). But this requires dogygen 1.9 or higher."
         )
+        parser.add_argument(
+            "-j", "--jobs",
+            action="store", type=int, dest="jobs", default=1,
+            help="specify the number of processes used to filter multiple files "
+                 "(0 for one per CPU)"
+        )
+        parser.add_argument(
+            "-b", "--batch",
+            action="store_true", dest="batch",
+            help="write the output for each file to filename.out instead of stdout"
+        )
         group = parser.add_argument_group("Debug Options")
         group.add_argument(
             "-d", "--debug",
@@ -1056,60 +1554,48 @@ def main():
 
         # Parse options based on our definition.
         args = parser.parse_args()
+        if args.jobs < 0:
+            parser.error("argument -j/--jobs: the number of processes can't be negative")
 
         # Just abort immediately if we are don't have an input file.
-        if not args.filename:
+        if not args.filenames:
             stderr.write("No filename given." + linesep)
             sysExit(-1)
 
-        # Turn the full path filename into a full path module location.
-        fullPathNamespace = args.filename.replace(sep, '.')[:-3]
-        # Use any provided top-level namespace argument to trim off excess.
-        realNamespace = fullPathNamespace
-        if args.topLevelNamespace:
-            namespaceStart = fullPathNamespace.find(args.topLevelNamespace)
-            if namespaceStart >= 0:
-                realNamespace = fullPathNamespace[namespaceStart:]
-        if args.stripinit:
-            realNamespace = realNamespace.replace('.__init__', '')
-        args.fullPathNamespace = realNamespace
-
-        return args
+        # Each file gets its own copy of the options.
+        allFileArgs = []
+        for filename in args.filenames:
+            fileArgs = Namespace(**vars(args))
+            del fileArgs.filenames
+            fileArgs.filename = filename
+            # Turn the full path filename into a full path module location.
+            fullPathNamespace = filename.replace(sep, '.')[:-3]
+            # Use any provided top-level namespace argument to trim off excess.
+            realNamespace = fullPathNamespace
+            if args.topLevelNamespace:
+                namespaceStart = fullPathNamespace.find(args.topLevelNamespace)
+                if namespaceStart >= 0:
+                    realNamespace = fullPathNamespace[namespaceStart:]
+            if args.stripinit:
+                realNamespace = realNamespace.replace('.__init__', '')
+            fileArgs.fullPathNamespace = realNamespace
+            allFileArgs.append(fileArgs)
+
+        return args, allFileArgs
 
     # Figure out what is being requested.
-    args = argParse()
-
-    # Figure out encoding of input file.
-    numOfSampleBytes = min(getsize(args.filename), 32)
-    sampleBytes = open(args.filename, 'rb').read(numOfSampleBytes)
-    sampleByteAnalysis = detect(sampleBytes)
-    encoding = sampleByteAnalysis['encoding'] or 'ascii'
-
-    # Switch to generic versions to strip the BOM automatically.
-    if sampleBytes.startswith(BOM_UTF8):
-        encoding = 'UTF-8-SIG'
-    if encoding.startswith("UTF-16"):
-        encoding = "UTF-16"
-    elif encoding.startswith("UTF-32"):
-        encoding = "UTF-32"
-
-    # Read contents of input file.
-    if encoding == 'ascii':
-        inFile = open(args.filename)
+    args, allFileArgs = argParse()
+
+    # Filter each file, spreading the work over several processes if asked
+    # to.  Either way the results come out in the order the files were given.
+    jobs = args.jobs
+    if (jobs > 1 or jobs == 0) and len(allFileArgs) > 1:
+        with ProcessPoolExecutor(max_workers=jobs or None) as executor:
+            for fileArgs, output in zip(allFileArgs, executor.map(filterFile, allFileArgs)):
+                writeOutput(fileArgs, output)
     else:
-        inFile = codecsOpen(args.filename, encoding=encoding)
-    lines = inFile.readlines()
-    inFile.close()
-    # Create the abstract syntax tree for the input file.
-    astWalker = AstWalker(lines, args)
-    astWalker.parseLines()
-    # Output the modified source.
-
-    # There is a "feature" in print on Windows. If linesep is
-    # passed, it will generate 0x0D 0x0D 0x0A each line which
-    # screws up Doxygen since it's expected 0x0D 0x0A line endings.
-    for line in astWalker.getLines().split(linesep):
-        print(line.rstrip())
+        for fileArgs in allFileArgs:
+            writeOutput(fileArgs, filterFile(fileArgs))
 
 
 # See if we're running as a script.
@@ -9,14 +9,18 @@ root level of the project.
 import unittest
 from argparse import Namespace
 from os import linesep, sep
-from os.path import basename, splitext
-from ast import parse
-from codecs import open as codecsOpen
-from sys import version_info
+from os.path import basename, join, splitext
+from ast import parse, get_docstring
+from re import compile as regexpCompile, MULTILINE
+from pathlib import Path
+from io import BytesIO, StringIO, TextIOWrapper
+from codecs import BOM_UTF8
+from contextlib import redirect_stderr, redirect_stdout
+from shutil import copy
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
 
-from pytest import mark
-
-from ..doxypypy import AstWalker
+from ..doxypypy import AstWalker, filterFile, writeOutput, main, _compileCommand, _decodeUtf8, _detectEncoding
 
 
 class TestDoxypypy(unittest.TestCase):
@@ -310,6 +314,21 @@ class TestDoxypypy(unittest.TestCase):
      it's git configuration dependent if these line endings are OS specific
      or just \n.
     """
+    __linesepDiffersForSource = linesep != __linesep_for_source
+
+    # The option sets samples are checked against their gold standards with,
+    # as (gold standard suffix, autobrief, autocode, top-level namespace,
+    # object_respect) tuples.  Everything else is the same for all of them.
+    __goldTrials = (
+        ('.out', True, True, True, False),
+        ('.outnc', True, False, True, False),
+        ('.outnn', True, True, False, False),
+        ('.outbare', False, False, False, False)
+    )
+    __equalIndentGoldTrials = (
+        ('.outeq', True, True, False, True),
+    )
+    __trailingWhitespaceRE = regexpCompile(r'[^\S\n]+$', MULTILINE)
 
     def setUp(self):
         """
@@ -318,34 +337,83 @@ class TestDoxypypy(unittest.TestCase):
         self.options = TestDoxypypy.__Options
         self.dummyWalker = AstWalker(TestDoxypypy.__dummySrc, self.options)
 
+    def test_getIndent(self):
+        """
+        Test the getIndent method.
+        """
+        testPairs = (
+            ('def foo():', ''),
+            ('    return 3', '    '),
+            ('\t\tpass' + linesep, '\t\t'),
+            ('  ## @var x' + linesep + '  x = 1', '  '),
+            ('    ' + linesep, ''),
+            ('', '')
+        )
+        for line, expected in testPairs:
+            with self.subTest(line=line):
+                self.assertEqual(self.dummyWalker._getIndent(line), expected)
+
     def test_stripOutAnds(self):
         """
         Test the stripOutAnds method.
         """
-        testPairs = {
-            'This and that.': 'This that.',
-            'This & that.': 'This that.',
-            'This, that, & more.': 'This, that, more.',
-            'This and that & etc.': 'This that etc.',
-            'Handy.': 'Handy.',
-            'This, that, &c.': 'This, that, &c.'
-        }
-        for pair in testPairs.items():
-            self.assertEqual(self.dummyWalker._stripOutAnds(pair[0]), pair[1])
+        testPairs = (
+            ('This and that.', 'This that.'),
+            ('This & that.', 'This that.'),
+            ('This, that, & more.', 'This, that, more.'),
+            ('This and that & etc.', 'This that etc.'),
+            ('Handy.', 'Handy.'),
+            ('This, that, &c.', 'This, that, &c.')
+        )
+        for inputLine, expected in testPairs:
+            with self.subTest(inputLine=inputLine):
+                self.assertEqual(self.dummyWalker._stripOutAnds(inputLine), expected)
 
     def test_endCodeIfNeeded(self):
         """
         Test the endCodeIfNeeded method.
         """
-        testPairs = {
-            ('unu', False): ('unu', False),
-            ('du', True): ('# @endcode' + linesep + 'du', False),
-            ('tri kvar', True): ('# @endcode' + linesep + 'tri kvar', False),
-            ('kvin  \t', True): ('# @endcode' + linesep + 'kvin', False)
-        }
-        for pair in testPairs.items():
-            self.assertEqual(self.dummyWalker._endCodeIfNeeded(*pair[0]),
-                             pair[1])
+        testPairs = (
+            (('unu', False), ('unu', False)),
+            (('du', True), ('# @endcode' + linesep + 'du', False)),
+            (('tri kvar', True), ('# @endcode' + linesep + 'tri kvar', False)),
+            (('kvin  \t', True), ('# @endcode' + linesep + 'kvin', False))
+        )
+        for args, expected in testPairs:
+            with self.subTest(args=args):
+                self.assertEqual(self.dummyWalker._endCodeIfNeeded(*args), expected)
+
+    def codeCheckerComparison(self, testPairs, inCodeBlock):
+        """
+        Compare the lines a code checker leaves behind against expectations.
+        """
+        for testLines, outputLines in testPairs:
+            codeChecker = self.dummyWalker._checkIfCode([inCodeBlock])
+            for lineNum, line in enumerate(testLines):
+                codeChecker.feed(line, testLines, lineNum)
+            self.assertEqual(testLines, outputLines)
+
+    def test_compileCommand(self):
+        """
+        Test the compileCommand function.
+        """
+        testPairs = (
+            ('x = 1', True),
+            ('if x:', False),
+            ('print(', False)
+        )
+        for source, expected in testPairs:
+            with self.subTest(source=source):
+                self.assertEqual(_compileCommand(source), expected)
+        # Invalid code raises an error every time, but never the same one
+        # (which would carry over whatever it picked up the last time).
+        errors = []
+        for _ in range(2):
+            with self.assertRaises(SyntaxError) as context:
+                _compileCommand('x = = 1')
+            errors.append(context.exception)
+        self.assertIsNot(errors[0], errors[1])
+        self.assertEqual(errors[0].args, errors[1].args)
 
     def test_checkIfCode(self):
         """
@@ -396,12 +464,7 @@ class TestDoxypypy(unittest.TestCase):
                 ]
             )
         ]
-        for testLines, outputLines in testPairs:
-            inCodeBlockObj = [False]
-            codeChecker = self.dummyWalker._checkIfCode(inCodeBlockObj)
-            for lineNum, line in enumerate(testLines):
-                codeChecker.send((line, testLines, lineNum))
-            self.assertEqual(testLines, outputLines)
+        self.codeCheckerComparison(testPairs, inCodeBlock=False)
 
     def test_checkIfProse(self):
         """
@@ -462,28 +525,108 @@ class TestDoxypypy(unittest.TestCase):
                 ]
             )
         ]
-        for testLines, outputLines in testPairs:
-            inCodeBlockObj = [True]
-            proseChecker = self.dummyWalker._checkIfCode(inCodeBlockObj)
-            for lineNum, line in enumerate(testLines):
-                proseChecker.send((line, testLines, lineNum))
-            self.assertEqual(testLines, outputLines)
+        self.codeCheckerComparison(testPairs, inCodeBlock=True)
 
     def test_checkMemberName(self):
         """
         Test the checkMemberName method.
         """
-        testPairs = {
-            'public': None,
-            '_protected': 'protected',
-            '_stillProtected_': 'protected',
-            '__private': 'private',
-            '__stillPrivate_': 'private',
-            '__notPrivate__': None
-        }
-        for pair in testPairs.items():
-            self.assertEqual(self.dummyWalker._checkMemberName(pair[0]),
-                             pair[1])
+        testPairs = (
+            ('public', None),
+            ('_protected', 'protected'),
+            ('_stillProtected_', 'protected'),
+            ('__private', 'private'),
+            ('__stillPrivate_', 'private'),
+            ('__notPrivate__', None)
+        )
+        for memberName, expected in testPairs:
+            with self.subTest(memberName=memberName):
+                self.assertEqual(self.dummyWalker._checkMemberName(memberName), expected)
+
+    def test_getIndentWidth(self):
+        """
+        Test the getIndentWidth method.
+        """
+        testPairs = (
+            (('def foo():', 4), 0),
+            (('    return 3', 4), 4),
+            (('\t\tpass' + linesep, 4), 8),
+            (('  \tx = 1', 4), 4),
+            (('\tx = 1', 8), 8),
+            (('', 4), 0)
+        )
+        for args, expected in testPairs:
+            with self.subTest(args=args):
+                self.assertEqual(self.dummyWalker._getIndentWidth(*args), expected)
+
+    def test_getNodeIndent(self):
+        """
+        Test the getNodeIndent method.
+        """
+        testPairs = (
+            ('x = 1', ''),
+            ('    x = 1', '    '),
+            ('\tx = 1' + linesep, '\t'),
+            ('    y = 2; x = 1', '    '),
+            ('    ## @var x' + linesep + '    x = 1', '    ')
+        )
+        for line, expected in testPairs:
+            with self.subTest(line=line):
+                node = Namespace(col_offset=line.rindex('x = 1'))
+                self.assertEqual(self.dummyWalker._getNodeIndent(line, node), expected)
+
+    def test_hasDocstring(self):
+        """
+        Test the hasDocstring method.
+        """
+        # Each source is paired with whether the module itself (rather than
+        # its first statement) is the node to check.
+        testPairs = (
+            (('def foo():\n    """Here is the brief."""', False), True),
+            (('class Foo(object):\n    \'Single quotes work too.\'', False), True),
+            (('"""A module docstring."""\nx = 1', True), True),
+            (('x = 1\n"""Not a module docstring."""', True), False),
+            (('def foo():\n    return 1', False), False),
+            (('def foo():\n    x = "Not a docstring."', False), False),
+            (('def foo():\n    b"Bytes are not docstrings."', False), False),
+            (('def foo():\n    """   """', False), False),
+            (('def foo():\n    """\n"""', False), False),
+            (('def foo():\n    """\n    """', False), True),
+            (('def foo():\n    """\n    \n    """', False), True),
+            (('', True), False)
+        )
+        for (source, useModule), expected in testPairs:
+            with self.subTest(source=source):
+                node = parse(source)
+                if not useModule:
+                    node = node.body[0]
+                self.assertEqual(self.dummyWalker._hasDocstring(node), expected)
+                # It has to agree with what get_docstring makes of it.
+                self.assertEqual(bool(get_docstring(node)), expected)
+
+    def test_subclassVisitors(self):
+        """
+        Test that handlers a subclass adds get called just like with NodeVisitor.
+        """
+        visited = []
+
+        class NameWalker(AstWalker):
+            """A walker that also notes down the names and passes it sees."""
+
+            def visit_Name(self, node, containingNodes=None):
+                """Note down a name."""
+                visited.append(node.id)
+                self.generic_visit(node, containingNodes)
+
+            def visit_Pass(self, node, containingNodes=None):
+                """Note down a pass statement."""
+                visited.append('pass')
+
+        testWalker = NameWalker(['x = y + 1' + linesep,
+                                 'if x:' + linesep,
+                                 '    pass' + linesep], self.options)
+        testWalker.parseLines()
+        self.assertEqual(visited, ['x', 'y', 'x', 'pass'])
 
     def test_getFullPathName(self):
         """
@@ -492,6 +635,19 @@ class TestDoxypypy(unittest.TestCase):
         self.assertEqual(self.dummyWalker._getFullPathName([('one', 'class')]),
                          [('dummy', 'module'), ('one', 'class')])
 
+    def test_getContextTag(self):
+        """
+        Test the getContextTag method.
+        """
+        testPairs = (
+            ([], 'dummy'),
+            ([('one', 'class')], 'dummy.one'),
+            ([('one', 'class'), ('two', 'function')], 'dummy.one.two')
+        )
+        for containingNodes, expected in testPairs:
+            with self.subTest(containingNodes=containingNodes):
+                self.assertEqual(self.dummyWalker._getContextTag(containingNodes), expected)
+
     def test_getLines(self):
         """
         Test the getLines method.
@@ -499,6 +655,17 @@ class TestDoxypypy(unittest.TestCase):
         self.assertEqual(self.dummyWalker.getLines(),
                          TestDoxypypy.__strippedDummySrc)
 
+    def test_iterLines(self):
+        """
+        Test the iterLines method.
+        """
+        self.assertEqual(list(self.dummyWalker.iterLines()),
+                         TestDoxypypy.__strippedDummySrc.split(linesep))
+        self.dummyWalker.lines = ['class A:  ' + linesep + '    ## @var x  ' + linesep + '    x = 1' + linesep,
+                                  '    y = 2  ']
+        self.assertEqual(list(self.dummyWalker.iterLines()),
+                         ['class A:', '    ## @var x', '    x = 1', '    y = 2'])
+
     def test_parseLines(self):
         """
         Test the parseLines method.
@@ -508,6 +675,23 @@ class TestDoxypypy(unittest.TestCase):
         self.assertEqual(self.dummyWalker.getLines(),
                          TestDoxypypy.__strippedDummySrc)
 
+    def test_parseLinesOneLineCode(self):
+        """
+        Test the parseLines method on single-line docstrings that look like code.
+
+        A one-line doctest (unlike a one-line statement) used to make the code
+        checker look at a line before the docstring and raise an IndexError.
+        """
+        testWalker = AstWalker(['def foo():' + linesep,
+                                '    """x = 1"""' + linesep,
+                                'def bar():' + linesep,
+                                '    """>>> foo()"""' + linesep],
+                               self.options)
+        testWalker.parseLines()
+        self.assertEqual(testWalker.getLines(),
+                         linesep.join(['## @brief x = 1', '# @namespace dummy.foo', 'def foo():',
+                                       '## @brief >>> foo()', '# @namespace dummy.bar', 'def bar():']))
+
     def snippetComparison(self, sampleSnippets):
         """
         Compare docstring parsing for a list of code snippets.
@@ -515,11 +699,11 @@ class TestDoxypypy(unittest.TestCase):
         options_name = self.options.filename
         for snippetTest in sampleSnippets:
             self.options.filename = snippetTest['name'] + '.py'
-            testWalker = AstWalker(snippetTest['inputCode'].split(self.__linesep_for_source),
-                                   self.options)
+            testWalker = AstWalker(snippetTest['inputCode'].split(self.__linesep_for_source), self.options)
             funcAst = parse(snippetTest['inputCode'])
             getattr(testWalker, snippetTest['visitor'])(funcAst.body[0])
-            testWalker.lines[:] = [line.replace(linesep, self.__linesep_for_source)  for line in testWalker.lines]
+            if self.__linesepDiffersForSource:
+                testWalker.lines[:] = [line.replace(linesep, self.__linesep_for_source) for line in testWalker.lines]
             self.assertEqual(testWalker.lines, snippetTest['expectedOutput'])
         self.options.filename = options_name
 
@@ -554,20 +738,23 @@ class TestDoxypypy(unittest.TestCase):
         self.snippetComparison(TestDoxypypy.__sampleRaises)
 
     @staticmethod
-    def readAndParseFile(options, encoding="ASCII"):
-        """
-        Helper function to read and parse a given file and create an AST walker.
-        """
-        inFilename = options.filename
-        # Read contents of input file.
-        if encoding == 'ASCII':
-            inFile = open(inFilename)
-        else:
-            inFile = codecsOpen(inFilename, encoding=encoding)
-        lines = inFile.readlines()
-        inFile.close()
-        # Create the abstract syntax tree for the input file.
-        testWalker = AstWalker(lines, options)
+    def readFile(inFilename, encoding="ASCII"):
+        """
+        Helper function to read the contents of a given file.
+        """
+        # Plain ASCII files are read with the default encoding.
+        return Path(inFilename).read_text(encoding=None if encoding == 'ASCII' else encoding)
+
+    @staticmethod
+    def parseFileContents(source, options):
+        """
+        Helper function to parse the contents of a file with an AST walker.
+        """
+        # Create the abstract syntax tree for the input file (on a fresh
+        # list of lines, as the walker modifies them in place, and handing
+        # over the source so it needn't be joined back together again).
+        # The lines are split just like filterFile does, only on newlines.
+        testWalker = AstWalker(StringIO(source).readlines(), options, source)
         testWalker.parseLines()
         # Output the modified source.
         return testWalker.getLines()
@@ -581,82 +768,32 @@ class TestDoxypypy(unittest.TestCase):
         """
         inFilenameBase = splitext(basename(inFilename))[0]
         fullPathNamespace = inFilenameBase.replace(sep, '.')
-        if not equalIndent:
-            trials = (
-                ('.out', Namespace(
-                    autobrief=True,
-                    autocode=True,
-                    debug=False,
-                    fullPathNamespace=fullPathNamespace,
-                    topLevelNamespace=inFilenameBase,
-                    tablength=4,
-                    filename=inFilename,
-                    object_respect=False,
-                    equalIndent=equalIndent,
-                    keepDecorators=False
-                )),
-                ('.outnc', Namespace(
-                    autobrief=True,
-                    autocode=False,
-                    debug=False,
-                    fullPathNamespace=fullPathNamespace,
-                    topLevelNamespace=inFilenameBase,
-                    tablength=4,
-                    filename=inFilename,
-                    object_respect=False,
-                    equalIndent=equalIndent,
-                    keepDecorators=False
-                )),
-                ('.outnn', Namespace(
-                    autobrief=True,
-                    autocode=True,
-                    debug=False,
-                    fullPathNamespace=fullPathNamespace,
-                    topLevelNamespace=None,
-                    tablength=4,
-                    filename=inFilename,
-                    object_respect=False,
-                    equalIndent=equalIndent,
-                    keepDecorators=False
-                )),
-                ('.outbare',  Namespace(
-                    autobrief=False,
-                    autocode=False,
-                    debug=False,
-                    fullPathNamespace=fullPathNamespace,
-                    topLevelNamespace=None,
-                    tablength=4,
-                    filename=inFilename,
-                    object_respect=False,
-                    equalIndent=equalIndent,
-                    keepDecorators=False
-                ))
+        goldFilenameBase = splitext(inFilename)[0]
+        trials = TestDoxypypy.__equalIndentGoldTrials if equalIndent else TestDoxypypy.__goldTrials
+
+        # Every trial works on the same input, so only read it once.
+        source = self.readFile(inFilename, encoding=encoding)
+        for suffix, autobrief, autocode, withNamespace, objectRespect in trials:
+            options = Namespace(
+                autobrief=autobrief,
+                autocode=autocode,
+                debug=False,
+                fullPathNamespace=fullPathNamespace,
+                topLevelNamespace=inFilenameBase if withNamespace else None,
+                tablength=4,
+                filename=inFilename,
+                object_respect=objectRespect,
+                equalIndent=equalIndent,
+                keepDecorators=False
             )
-        else:
-            trials = (('.outeq',  Namespace(
-                    autobrief=True,
-                    autocode=True,
-                    debug=False,
-                    fullPathNamespace=fullPathNamespace,
-                    topLevelNamespace=None,
-                    tablength=4,
-                    filename=inFilename,
-                    object_respect=True,
-                    equalIndent=equalIndent,
-                    keepDecorators=False
-                )),)
-                
-        for options in trials:
-            output = self.readAndParseFile(options[1], encoding=encoding)
-            goldFilename = splitext(inFilename)[0] + options[0] + '.py'
-            goldFile = open(goldFilename)
-            goldContentLines = goldFile.readlines()
-            goldFile.close()
+            output = self.parseFileContents(source, options)
+            goldFilename = goldFilenameBase + suffix + '.py'
             # We have to go through some extra processing to ensure line
-            # endings match across platforms.
-            goldContent = linesep.join(line.rstrip()
-                                       for line in goldContentLines)
-            self.assertEqual(output.rstrip(linesep), goldContent.rstrip(linesep))
+            # endings match across platforms (and drop trailing whitespace
+            # like the filter does).
+            goldContent = TestDoxypypy.__trailingWhitespaceRE.sub(
+                '', Path(goldFilename).read_text()).replace('\n', linesep)
+            self.assertMultiLineEqual(output.rstrip(linesep), goldContent.rstrip(linesep))
 
     def test_pepProcessing(self):
         """
@@ -665,7 +802,6 @@ class TestDoxypypy(unittest.TestCase):
         sampleName = 'doxypypy/test/sample_pep.py'
         self.compareAgainstGoldStandard(sampleName)
 
-    @mark.skipif(version_info < (3, 0), reason="different behavior for Python 2")
     def test_privacyProcessing(self):
         """
         Test an example with different combinations of public, protected, and private.
@@ -750,7 +886,90 @@ class TestDoxypypy(unittest.TestCase):
         sampleName = 'doxypypy/test/sample_utf32lebom.py'
         self.compareAgainstGoldStandard(sampleName, encoding="UTF-32")
 
-    @mark.skipif(version_info < (3, 0), reason="not supported in Python 2")
+    def test_decodeUtf8(self):
+        """
+        Test the decodeUtf8 function.
+
+        Anything it decodes should come out just as reading the file in text
+        mode would give it.
+        """
+        testPairs = (
+            (b"print('plain')\n", True),
+            ("print('\u00e9t\u00e9')\n".encode('utf-8'), True),
+            (b"", True),
+            (BOM_UTF8 + b"x = 1\n", True),
+            (b"x = 1\r\ny = 2\r\n", True),
+            (b"x = 1\ry = 2\r", True),
+            (BOM_UTF8 + b"x = 1\r\ny = 2\rz = 3\n", True),
+            (b"x = 1\x0cy = 2\n", True),
+            (b"x = 1\0\n", False),
+            ("x = 1\n".encode('utf-16'), False),
+            ("x = 1\n".encode('utf-32'), False),
+            (b"x = '\xe9'\n", False)
+        )
+        for rawSource, isUtf8 in testPairs:
+            with self.subTest(rawSource=rawSource):
+                expected = TextIOWrapper(BytesIO(rawSource), encoding='utf-8-sig').read() if isUtf8 else None
+                self.assertEqual(_decodeUtf8(rawSource), expected)
+
+    @staticmethod
+    def fakeDetector(encoding):
+        """
+        Helper function to stand in for an encoding detector module.
+
+        The stand-in claims to find the given encoding in anything.
+        """
+        return Namespace(detect=lambda sampleBytes: {'encoding': encoding})
+
+    def test_detectEncoding(self):
+        """
+        Test the detectEncoding function.
+        """
+        testPairs = (
+            ('ascii', 'ascii'),
+            (None, 'ascii'),
+            ('UTF-8-SIG', 'utf-8-sig'),
+            ('UTF-16LE', 'utf-16-le'),
+            ('UTF-32BE', 'utf-32-be'),
+            ('Windows-1252', 'cp1252'),
+            ('ISO-8859-1', 'iso8859-1'),
+            ('EUC-JP', 'euc_jp')
+        )
+        for detected, expected in testPairs:
+            with self.subTest(detected=detected), \
+                    patch.dict('sys.modules', {'cchardet': None, 'chardet': self.fakeDetector(detected)}):
+                self.assertEqual(_detectEncoding(b'sample'), expected)
+        # The faster cchardet gets used whenever it's around.
+        with patch.dict('sys.modules', {'cchardet': self.fakeDetector('UTF-16BE'),
+                                        'chardet': self.fakeDetector('Windows-1252')}):
+            self.assertEqual(_detectEncoding(b'sample'), 'utf-16-be')
+
+    def test_filterFileEncodings(self):
+        """
+        Test that filterFile decodes files that aren't UTF-8 properly.
+
+        Whatever flavor of UTF-16 or UTF-32 gets detected, the file should
+        be filtered just like a UTF-8 version of it without the BOM.
+        """
+        testPairs = (
+            (('sample_utf16bebom.py', 'UTF-16'), 'UTF-16BE'),
+            (('sample_utf16lebom.py', 'UTF-16'), 'UTF-16LE'),
+            (('sample_utf16lebom.py', 'UTF-16'), 'UTF-16'),
+            (('sample_utf32bebom.py', 'UTF-32'), 'UTF-32BE'),
+            (('sample_utf32lebom.py', 'UTF-32'), 'UTF-32LE')
+        )
+        options = Namespace(**vars(self.options))
+        with TemporaryDirectory() as tempDir:
+            for (sampleName, encoding), detected in testPairs:
+                with self.subTest(sampleName=sampleName, detected=detected):
+                    options.filename = join(tempDir, 'utf8.py')
+                    Path(options.filename).write_text(self.readFile(join('doxypypy', 'test', sampleName), encoding),
+                                                      encoding='utf-8')
+                    expected = filterFile(options)
+                    options.filename = join('doxypypy', 'test', sampleName)
+                    with patch.dict('sys.modules', {'cchardet': None, 'chardet': self.fakeDetector(detected)}):
+                        self.assertEqual(filterFile(options), expected)
+
     def test_rstProcessing(self):
         """
         Test the examples for rst styles.
@@ -758,7 +977,6 @@ class TestDoxypypy(unittest.TestCase):
         sampleName = 'doxypypy/test/sample_rstexample.py'
         self.compareAgainstGoldStandard(sampleName)
 
-    @mark.skipif(version_info < (3, 0), reason="not supported in Python 2")
     def test_indentProcessing(self):
         """
         Test the examples with rst and indentation reduction.
@@ -766,7 +984,6 @@ class TestDoxypypy(unittest.TestCase):
         sampleName = 'doxypypy/test/sample_rstexample.py'
         self.compareAgainstGoldStandard(sampleName, equalIndent=True)
 
-    @mark.skipif(version_info < (3, 0), reason="not supported in Python 2")
     def test_asyncProcessing(self):
         """
         Test the examples with async functions and methods.
@@ -774,6 +991,51 @@ class TestDoxypypy(unittest.TestCase):
         sampleName = 'doxypypy/test/sample_async.py'
         self.compareAgainstGoldStandard(sampleName)
 
+    def test_batchOutput(self):
+        """
+        Test that batch mode writes out just what would otherwise be printed.
+        """
+        options = Namespace(**vars(self.options), batch=False)
+        with TemporaryDirectory() as tempDir:
+            options.filename = copy('doxypypy/test/sample_pep.py', tempDir)
+            output = filterFile(options)
+            printedOutput = StringIO()
+            with redirect_stdout(printedOutput):
+                writeOutput(options, output)
+            options.batch = True
+            writeOutput(options, output)
+            batchOutput = Path(options.filename + '.out').read_text(encoding='utf-8')
+        self.assertEqual(batchOutput, printedOutput.getvalue())
+
+    def test_parallelBatchOutput(self):
+        """
+        Test filtering several files in batch mode with one process per CPU.
+
+        Each file's output should match what filtering them all one after
+        the other in a single process prints.
+        """
+        sampleNames = ('sample_pep.py', 'sample_google.py', 'sample_maze.py')
+        with TemporaryDirectory() as tempDir:
+            filenames = [copy(join('doxypypy', 'test', sampleName), tempDir) for sampleName in sampleNames]
+            printedOutput = StringIO()
+            with patch('sys.argv', ['doxypypy', '-a', '-c'] + filenames), redirect_stdout(printedOutput):
+                main()
+            with patch('sys.argv', ['doxypypy', '-a', '-c', '-j', '0', '-b'] + filenames):
+                main()
+            batchOutput = ''.join(Path(filename + '.out').read_text(encoding='utf-8') for filename in filenames)
+        self.assertEqual(batchOutput, printedOutput.getvalue())
+
+    def test_negativeJobs(self):
+        """
+        Test that a negative number of processes is rejected.
+        """
+        errorOutput = StringIO()
+        with patch('sys.argv', ['doxypypy', '-j', '-3', 'doxypypy/test/sample_pep.py']), \
+                redirect_stderr(errorOutput), self.assertRaises(SystemExit) as context:
+            main()
+        self.assertEqual(context.exception.code, 2)
+        self.assertIn("the number of processes can't be negative", errorOutput.getvalue())
+
         
 if __name__ == '__main__':
     # When executed from the command line, run all the tests via unittest.
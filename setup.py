@@ -2,28 +2,47 @@
 # -*- coding: utf-8 -*-
 """Setup file for the doxypypy package."""
 
-from setuptools import setup, find_packages
+from setuptools import setup
 from os.path import dirname, join
-from os import chdir
+from os import chdir, environ
 
 if dirname(__file__):
     chdir(dirname(__file__))
 
+# The filter can optionally be compiled with Cython, which speeds it up
+# when running over large code bases.  This only happens when asked for via
+# the environment and Cython is available; otherwise the plain Python
+# module gets installed as usual.
+extModules = []
+if environ.get('DOXYPYPY_CYTHON'):
+    try:
+        from Cython.Build import cythonize
+    except ImportError:
+        pass
+    else:
+        extModules = cythonize(['doxypypy/doxypypy.py'], language_level=3)
+
+with open(join(dirname(__file__), 'README.rst'), encoding='utf-8') as readmeFile:
+    longDescription = readmeFile.read()
+
 setup(
     name='doxypypy',
     version='0.8.8.7',
     description='A Doxygen filter for Python',
-    long_description=open(join(dirname(__file__), 'README.rst')).read(),
+    long_description=longDescription,
     keywords='Doxygen filter Python documentation',
     author='Eric W. Brown',
     url='https://github.com/Feneric/doxypypy',
-    packages=find_packages(),
+    packages=['doxypypy', 'doxypypy.test'],
+    ext_modules=extModules,
+    python_requires='>=3.8',
     install_requires=[
         'chardet'
     ],
     test_suite='doxypypy.test.test_doxypypy',
     extras_require={
         'testing': ['pytest', 'tox'],
+        'speedups': ['faust-cchardet'],
     },
     entry_points={
         'console_scripts': [
@@ -42,6 +61,8 @@ setup(
         'Operating System :: POSIX',
         'Operating System :: Unix',
         'Programming Language :: Python',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Topic :: Software Development :: Documentation'
     ]
 )